@@ -1,5 +1,7 @@
 """Application configuration loaded from environment variables."""
 
+from dataclasses import make_dataclass
+
 from pydantic_settings import BaseSettings
 
 
@@ -19,6 +21,12 @@ class Settings(BaseSettings):
     # Embedding model name
     embedding_model_name: str = "paraphrase-multilingual-MiniLM-L12-v2"
 
+    # Local model precision: "auto" (fp16 on GPU, dynamic int8 on CPU), "fp16", "int8" or "fp32"
+    embedding_precision: str = "auto"
+
+    # Local model runtime: "torch" or "onnx" (ONNX Runtime on CPU; needs sentence-transformers[onnx])
+    embedding_backend: str = "torch"
+
     # Groq model name (llama-3.3-70b: free, 128K context, great Hebrew support)
     groq_model_name: str = "llama-3.3-70b-versatile"
 
@@ -26,6 +34,8 @@ class Settings(BaseSettings):
     rag_match_threshold: float = 0.25
     rag_match_count: int = 8
     rag_max_completion_tokens: int = 4096
+    # Estimated-token budget for retrieved context sent to the LLM
+    rag_context_token_budget: int = 4096
     rag_temperature: float = 0.7
     rag_top_p: float = 0.9
 
@@ -36,4 +46,13 @@ class Settings(BaseSettings):
     }
 
 
-settings = Settings()
+# Parse the environment once, then freeze the values into a slotted dataclass so hot-path
+# reads like `settings.groq_model_name` are plain slot accesses rather than Pydantic attributes.
+FrozenSettings = make_dataclass(
+    "FrozenSettings",
+    [(name, field.annotation) for name, field in Settings.model_fields.items()],
+    frozen=True,
+    slots=True,
+)
+
+settings = FrozenSettings(**Settings().model_dump())
@@ -0,0 +1,24 @@
+"""ETag / Cache-Control helpers for endpoints that serve pre-serialized, rarely-changing JSON."""
+
+from __future__ import annotations
+
+import hashlib
+
+from fastapi import Request
+from fastapi.responses import Response
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag (quoted, per RFC 9110) derived from the response body."""
+    return '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+
+def cached_json_response(request: Request, body: bytes, etag: str, max_age: int) -> Response:
+    """
+    Return `body` as JSON with caching headers, or an empty 304 if the client already has it.
+    """
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
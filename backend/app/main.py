@@ -2,17 +2,22 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.config import settings
+from app.middleware.cors_asgi import ASGICORS
 from app.models import HealthResponse
 from app.routers import chat, search, sections
-from app.services.embeddings import load_model
+from app.routers.search import SUGGESTED_QUESTIONS
+from app.services.database import close_http_client, get_http_client
+from app.services.embeddings import close_hf_clients, load_model, warm_embedding_cache
+from app.services.groq_client import close_groq_client
 
 logging.basicConfig(
     level=logging.INFO,
@@ -21,13 +26,36 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def _warm_embeddings(model_task: asyncio.Task) -> None:
+    """Once the model is loaded, pre-embed the suggested questions shown in the chat widget."""
+    try:
+        await model_task
+    except Exception as e:
+        logger.error("Skipping embedding warm-up, model load failed: %s", e)
+        return
+    await warm_embedding_cache(SUGGESTED_QUESTIONS)
+
+
 @asynccontextmanager
 async def lifespan(application: FastAPI) -> AsyncGenerator[None, None]:
-    """Application lifespan: load the embedding model on startup."""
+    """Application lifespan: load the embedding model in the background on startup."""
     logger.info("Starting Tokyo Guide Backend...")
-    load_model()
-    logger.info("Application ready.")
+    # Build the PostgREST client up front so the first request doesn't pay for it
+    try:
+        get_http_client()
+    except RuntimeError as e:
+        logger.warning("Database client not initialized: %s", e)
+    # Don't block startup on the model download/load; endpoints await it via ensure_model_ready
+    application.state.model_task = asyncio.create_task(asyncio.to_thread(load_model))
+    application.state.warmup_task = asyncio.create_task(_warm_embeddings(application.state.model_task))
+    logger.info("Application ready (embedding model loading in background).")
     yield
+    for task in (application.state.warmup_task, application.state.model_task):
+        if not task.done():
+            task.cancel()
+    await close_http_client()
+    await close_groq_client()
+    await close_hf_clients()
     logger.info("Shutting down Tokyo Guide Backend.")
 
 
@@ -36,6 +64,7 @@ app = FastAPI(
     description="RAG-powered Tokyo travel guide with chat and content browsing.",
     version="0.1.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # ── CORS ────────────────────────────────────────────────────────────────────
@@ -48,13 +77,8 @@ allowed_origins = [
     "https://*.vercel.app",  # Allow all Vercel preview deployments
 ]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins for now (safe for public API)
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Pure ASGI wrapper: no per-request Request/Response allocation, preflight answered inline
+app.add_middleware(ASGICORS)  # Allow all origins for now (safe for public API)
 
 # ── Routers ─────────────────────────────────────────────────────────────────
 app.include_router(chat.router)
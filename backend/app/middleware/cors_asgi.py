@@ -0,0 +1,49 @@
+"""Minimal pure-ASGI CORS middleware for the public, credential-less API."""
+
+from __future__ import annotations
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class ASGICORS:
+    """
+    Add CORS headers without wrapping requests/responses in Starlette objects.
+
+    Preflight requests are answered inline with a 204; every other HTTP
+    response gets `Access-Control-Allow-Origin` appended to its start message.
+    """
+
+    def __init__(self, app: ASGIApp, allow_origin: bytes = b"*") -> None:
+        self.app = app
+        self.allow_origin = allow_origin
+        self._preflight_headers = [
+            (b"access-control-allow-origin", allow_origin),
+            (b"access-control-allow-methods", b"*"),
+            (b"access-control-allow-headers", b"*"),
+            (b"access-control-max-age", b"600"),
+            (b"content-length", b"0"),
+        ]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS" and _has_header(scope, b"access-control-request-method"):
+            await send({"type": "http.response.start", "status": 204, "headers": self._preflight_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"access-control-allow-origin", self.allow_origin)
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _has_header(scope: Scope, name: bytes) -> bool:
+    """Check whether the raw ASGI request headers contain `name` (lower-case)."""
+    return any(key == name for key, _ in scope["headers"])
@@ -2,7 +2,8 @@
 
 from __future__ import annotations
 
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Any, Optional
 
 from pydantic import BaseModel, Field
 
@@ -65,6 +66,50 @@ class ContentItem(BaseModel):
     best_time_to_visit: Optional[str] = None
 
 
+@dataclass(frozen=True, slots=True)
+class ContentRecord:
+    """
+    Lightweight, serialize-only twin of ContentItem for the list endpoints.
+
+    Built straight from DB rows without Pydantic validation; orjson serializes
+    slotted dataclasses natively, producing the same JSON shape as ContentItem.
+    """
+
+    id: str
+    title: str
+    title_hebrew: str
+    content: str = ""
+    content_hebrew: str = ""
+    category: str = ""
+    subcategory: Optional[str] = None
+    tags: list[str] = field(default_factory=list)
+    location_name: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    price_range: Optional[str] = None
+    recommended_duration: Optional[str] = None
+    best_time_to_visit: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: dict[str, Any], category: str = "") -> ContentRecord:
+        """Build a record from a tokyo_content row, falling back to `category` if the row lacks one."""
+        return cls(
+            id=str(row["id"]),
+            title=row.get("title", ""),
+            title_hebrew=row.get("title_hebrew", ""),
+            content_hebrew=row.get("content_hebrew", ""),
+            category=row.get("category", category),
+            subcategory=row.get("subcategory"),
+            tags=row.get("tags") or [],
+            location_name=row.get("location_name"),
+            latitude=row.get("latitude"),
+            longitude=row.get("longitude"),
+            price_range=row.get("price_range"),
+            recommended_duration=row.get("recommended_duration"),
+            best_time_to_visit=row.get("best_time_to_visit"),
+        )
+
+
 class CategoryInfo(BaseModel):
     """Category with item count."""
 
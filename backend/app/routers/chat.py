@@ -3,18 +3,57 @@
 from __future__ import annotations
 
 import logging
+from typing import Any, AsyncIterator
 
-from fastapi import APIRouter, HTTPException
+import orjson
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 
 from app.models import ChatRequest, ChatResponse
-from app.services.rag import answer_question
+from app.services.embeddings import ensure_model_ready
+from app.services.rag import (
+    RagEmbedError,
+    RagError,
+    RagLLMError,
+    RagTimeout,
+    answer_question,
+    answer_question_stream,
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["chat"])
 
+# Pipeline failure type -> (HTTP status, user-facing message)
+_ERR_MAP: dict[type[RagError], tuple[int, str]] = {
+    RagTimeout: (504, "השירות עמוס. נסה שוב בעוד רגע."),
+    RagEmbedError: (503, "שירות ה-AI זמנית לא זמין. נסה שוב."),
+    RagLLMError: (503, "שירות השפה זמנית לא זמין. נסה שוב."),
+}
+_GENERIC_ERROR = (500, "שגיאה בעיבוד השאלה. נסה שוב.")
 
-@router.post("/chat", response_model=ChatResponse)
+
+def _error_for(e: Exception) -> tuple[int, str]:
+    """(HTTP status, message) for a failure, matching subclasses of the mapped error types too."""
+    for cls in type(e).__mro__:
+        if cls in _ERR_MAP:
+            return _ERR_MAP[cls]
+    return _GENERIC_ERROR
+
+
+def _http_error(e: Exception) -> HTTPException:
+    """Log a pipeline failure and map it to the HTTP error the client sees."""
+    logger.error("Chat endpoint error: %s", e, exc_info=True)
+    status_code, detail = _error_for(e)
+    return HTTPException(status_code=status_code, detail=detail)
+
+
+def _sse_event(event: str, data: dict[str, Any]) -> bytes:
+    """Encode one server-sent event."""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+@router.post("/chat", response_model=ChatResponse, dependencies=[Depends(ensure_model_ready)])
 async def chat(request: ChatRequest) -> ChatResponse:
     """
     Main chat endpoint. Accepts a question in Hebrew/English, retrieves relevant
@@ -30,12 +69,42 @@ async def chat(request: ChatRequest) -> ChatResponse:
         )
         return response
     except Exception as e:
-        logger.error("Chat endpoint error: %s", e, exc_info=True)
-        error_msg = str(e)
-        if "timeout" in error_msg.lower():
-            raise HTTPException(status_code=504, detail="השירות עמוס. נסה שוב בעוד רגע.")
-        elif "HF API" in error_msg or "embedding" in error_msg.lower():
-            raise HTTPException(status_code=503, detail="שירות ה-AI זמנית לא זמין. נסה שוב.")
-        elif "groq" in error_msg.lower():
-            raise HTTPException(status_code=503, detail="שירות השפה זמנית לא זמין. נסה שוב.")
-        raise HTTPException(status_code=500, detail="שגיאה בעיבוד השאלה. נסה שוב.")
+        raise _http_error(e)
+
+
+@router.post("/chat/stream", dependencies=[Depends(ensure_model_ready)])
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    """
+    Streaming chat endpoint (server-sent events).
+
+    Sends a "meta" event with the session ID and sources, then "token" events as the
+    answer is generated, and a final "done" event with suggested follow-up questions.
+    Retrieval errors still come back as regular HTTP errors; a failure after streaming
+    has started is reported as an "error" event.
+    """
+    events = answer_question_stream(
+        question=request.question,
+        session_id=request.session_id,
+        platform="web",
+    )
+    # Run retrieval before committing to a 200, so its failures keep their status codes
+    try:
+        first = await anext(events)
+    except Exception as e:
+        raise _http_error(e)
+
+    async def body() -> AsyncIterator[bytes]:
+        yield _sse_event(*first)
+        try:
+            async for event in events:
+                yield _sse_event(*event)
+        except Exception as e:
+            logger.error("Chat stream error: %s", e, exc_info=True)
+            yield _sse_event("error", {"detail": _error_for(e)[1]})
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -4,9 +4,12 @@ from __future__ import annotations
 
 import logging
 
-from fastapi import APIRouter, HTTPException
+import orjson
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response
 
-from app.models import ContentItem, SearchRequest, SearchResponse, SuggestionsResponse
+from app.http_cache import cached_json_response, make_etag
+from app.models import ContentRecord, SearchRequest, SearchResponse, SuggestionsResponse
 from app.services.database import keyword_search
 
 logger = logging.getLogger(__name__)
@@ -27,32 +30,25 @@ SUGGESTED_QUESTIONS: list[str] = [
     "האם כדאי לבקר בקיוטו?",
 ]
 
+# The suggestions never change at runtime: serialize once and let browsers cache them
+_SUGGESTIONS_BODY = orjson.dumps({"suggestions": SUGGESTED_QUESTIONS})
+_SUGGESTIONS_ETAG = make_etag(_SUGGESTIONS_BODY)
+SUGGESTIONS_MAX_AGE_SECONDS = 3600
+
 
 @router.post("/search", response_model=SearchResponse)
-async def search(request: SearchRequest) -> SearchResponse:
+async def search(request: SearchRequest) -> ORJSONResponse:
     """Keyword search across content, with optional category filter."""
     try:
-        results = keyword_search(query=request.query, category=request.category)
-        items = [
-            ContentItem(
-                id=str(item["id"]),
-                title=item.get("title", ""),
-                title_hebrew=item.get("title_hebrew", ""),
-                content_hebrew=item.get("content_hebrew", ""),
-                category=item.get("category", ""),
-                subcategory=item.get("subcategory"),
-                tags=item.get("tags") or [],
-                location_name=item.get("location_name"),
-            )
-            for item in results
-        ]
-        return SearchResponse(results=items, total=len(items))
+        results = await keyword_search(query=request.query, category=request.category)
+        items = [ContentRecord.from_row(item) for item in results]
+        return ORJSONResponse(content={"results": items, "total": len(items)})
     except Exception as e:
         logger.error("Search failed for query '%s': %s", request.query, e)
         raise HTTPException(status_code=500, detail="שגיאה בחיפוש.")
 
 
 @router.get("/suggestions", response_model=SuggestionsResponse)
-async def get_suggestions() -> SuggestionsResponse:
+async def get_suggestions(request: Request) -> Response:
     """Return popular suggested questions for the chat widget."""
-    return SuggestionsResponse(suggestions=SUGGESTED_QUESTIONS)
+    return cached_json_response(request, _SUGGESTIONS_BODY, _SUGGESTIONS_ETAG, SUGGESTIONS_MAX_AGE_SECONDS)
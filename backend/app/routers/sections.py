@@ -4,9 +4,11 @@ from __future__ import annotations
 
 import logging
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response
 
-from app.models import CategoryInfo, ContentItem, SectionsResponse
+from app.http_cache import cached_json_response, make_etag
+from app.models import CategoryInfo, ContentItem, ContentRecord, SectionsResponse
 from app.services.database import get_all_categories, get_content_by_category
 
 logger = logging.getLogger(__name__)
@@ -27,56 +29,59 @@ CATEGORY_META: dict[str, dict[str, str]] = {
     "itinerary": {"label_hebrew": "הצעות למסלולים", "icon": "🗺️"},
 }
 
+# Serialized SectionsResponse bodies (with their ETags) keyed by the (category, count) pairs they
+# were built from. The category set is tiny and only changes on re-seed, so this stays a handful of entries.
+_sections_cache: dict[tuple[tuple[str, int], ...], tuple[bytes, str]] = {}
+
+# Browsers may reuse /api/sections for this long before revalidating with If-None-Match
+SECTIONS_MAX_AGE_SECONDS = 300
+
+
+def _render_sections(key: tuple[tuple[str, int], ...]) -> bytes:
+    """Build and serialize the SectionsResponse for the given (category, count) pairs."""
+    categories = []
+    for cat, count in key:
+        meta = CATEGORY_META.get(cat)
+        categories.append(
+            CategoryInfo(
+                category=cat,
+                label_hebrew=meta["label_hebrew"] if meta else cat,
+                count=count,
+                icon=meta["icon"] if meta else "📌",
+            )
+        )
+    return SectionsResponse(categories=categories).model_dump_json().encode()
+
 
 @router.get("/sections", response_model=SectionsResponse)
-async def get_sections() -> SectionsResponse:
+async def get_sections(request: Request) -> Response:
     """Get all content categories with item counts."""
     try:
-        raw_categories = get_all_categories()
-        categories = []
-        for item in raw_categories:
-            cat = item["category"]
-            meta = CATEGORY_META.get(cat, {"label_hebrew": cat, "icon": "📌"})
-            categories.append(
-                CategoryInfo(
-                    category=cat,
-                    label_hebrew=meta["label_hebrew"],
-                    count=item["count"],
-                    icon=meta["icon"],
-                )
-            )
-        return SectionsResponse(categories=categories)
+        raw_categories = await get_all_categories()
+        key = tuple((item["category"], item["count"]) for item in raw_categories)
+        cached = _sections_cache.get(key)
+        if cached is None:
+            body = _render_sections(key)
+            cached = (body, make_etag(body))
+            _sections_cache[key] = cached
+        body, etag = cached
+        return cached_json_response(request, body, etag, SECTIONS_MAX_AGE_SECONDS)
     except Exception as e:
         logger.error("Failed to get sections: %s", e)
         raise HTTPException(status_code=500, detail="שגיאה בטעינת הקטגוריות.")
 
 
 @router.get("/section/{category}", response_model=list[ContentItem])
-async def get_section_content(category: str) -> list[ContentItem]:
+async def get_section_content(category: str) -> ORJSONResponse:
     """Get all content items for a specific category."""
     if category not in CATEGORY_META:
         raise HTTPException(status_code=404, detail=f"קטגוריה '{category}' לא נמצאה.")
 
     try:
-        items = get_content_by_category(category)
-        return [
-            ContentItem(
-                id=str(item["id"]),
-                title=item.get("title", ""),
-                title_hebrew=item.get("title_hebrew", ""),
-                content_hebrew=item.get("content_hebrew", ""),
-                category=item.get("category", category),
-                subcategory=item.get("subcategory"),
-                tags=item.get("tags") or [],
-                location_name=item.get("location_name"),
-                latitude=item.get("latitude"),
-                longitude=item.get("longitude"),
-                price_range=item.get("price_range"),
-                recommended_duration=item.get("recommended_duration"),
-                best_time_to_visit=item.get("best_time_to_visit"),
-            )
-            for item in items
-        ]
+        items = await get_content_by_category(category)
+        # Rows come straight from the DB with known columns; skip per-row Pydantic validation
+        # and let orjson serialize the slotted records directly (response_model is kept for the docs).
+        return ORJSONResponse(content=[ContentRecord.from_row(item, category) for item in items])
     except Exception as e:
         logger.error("Failed to get content for category '%s': %s", category, e)
         raise HTTPException(status_code=500, detail="שגיאה בטעינת התוכן.")
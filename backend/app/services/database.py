@@ -3,139 +3,325 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Optional
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Optional, Sequence
 
+import httpx
 from supabase import Client, create_client
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
-# Singleton client
+# Singleton clients: sync supabase-py for the seeding scripts, async PostgREST for the API
 _client: Optional[Client] = None
+_http: Optional[httpx.AsyncClient] = None
+# Guards singleton creation so racing callers can't each build (and leak) a client
+_client_lock = threading.Lock()
+
+# Category counts change only on re-seed, so /api/sections serves them from a short TTL cache
+CATEGORY_COUNTS_TTL_SECONDS = 60.0
+_category_counts_cache: Optional[tuple[float, list[dict[str, Any]]]] = None
+
+# Keyword search: columns returned and the substring-fallback filter template
+KEYWORD_SEARCH_LIMIT = 20
+KEYWORD_SEARCH_COLUMNS = "id,title,title_hebrew,content_hebrew,category,subcategory,tags,location_name"
+KEYWORD_SEARCH_OR_FILTER = "(content_hebrew.ilike.{pattern},title_hebrew.ilike.{pattern},title.ilike.{pattern})"
+
+# Category listing: every display column except the bulky English content and the embedding
+CATEGORY_CONTENT_COLUMNS = (
+    "id,title,title_hebrew,content_hebrew,category,subcategory,tags,location_name,"
+    "latitude,longitude,price_range,recommended_duration,best_time_to_visit"
+)
 
 
 def get_supabase_client() -> Client:
-    """Get or create the Supabase client singleton."""
+    """Get or create the Supabase client singleton (used by the offline seeding scripts)."""
     global _client
     if _client is None:
-        if not settings.supabase_url or not settings.supabase_key:
-            raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set in environment variables")
-        _client = create_client(settings.supabase_url, settings.supabase_key)
-        logger.info("Supabase client initialized")
+        with _client_lock:
+            if _client is None:
+                if not settings.supabase_url or not settings.supabase_key:
+                    raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set in environment variables")
+                _client = create_client(settings.supabase_url, settings.supabase_key)
+                logger.info("Supabase client initialized")
     return _client
 
 
-def vector_search(
-    query_embedding: list[float],
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get or create the shared async PostgREST client.
+
+    Request handlers talk to PostgREST directly over one pooled HTTP/2 connection
+    instead of going through the blocking supabase-py client.
+    """
+    global _http
+    if _http is None:
+        with _client_lock:
+            if _http is None:
+                if not settings.supabase_url or not settings.supabase_key:
+                    raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set in environment variables")
+                _http = httpx.AsyncClient(
+                    base_url=f"{settings.supabase_url}/rest/v1",
+                    headers={
+                        "apikey": settings.supabase_key,
+                        "Authorization": f"Bearer {settings.supabase_key}",
+                    },
+                    http2=True,
+                    timeout=10.0,
+                    limits=httpx.Limits(max_keepalive_connections=50),
+                )
+                logger.info("Async PostgREST client initialized")
+    return _http
+
+
+async def close_http_client() -> None:
+    """Close the shared async PostgREST client (called on application shutdown)."""
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+
+
+@lru_cache(maxsize=4)
+def _vector_template(dim: int) -> str:
+    """printf template for a `dim`-length pgvector literal, built once per dimension."""
+    return "[" + ",".join(["%.6f"] * dim) + "]"
+
+
+def format_vector(embedding: Sequence[float]) -> str:
+    """
+    Render an embedding as a pgvector text literal ('[x,y,...]').
+
+    Six decimals are plenty for cosine ranking and keep the RPC body ~3x smaller
+    than JSON-encoding full-precision Python floats. The whole vector goes through
+    one %-format call instead of formatting each float separately.
+    """
+    return _vector_template(len(embedding)) % tuple(embedding)
+
+
+async def vector_search(
+    query_embedding: Sequence[float],
     match_threshold: float = 0.5,
     match_count: int = 5,
+    category: Optional[str] = None,
 ) -> list[dict[str, Any]]:
     """
     Search for similar content using pgvector via the match_documents RPC function.
 
+    Filtering and top-K ranking happen in a single server-side query, and each
+    match already carries the fields needed for sources/content items, so no
+    follow-up hydration queries are needed.
+
     Args:
-        query_embedding: The 384-dimensional embedding vector of the query.
+        query_embedding: The 384-dimensional embedding vector of the query (list or ndarray).
         match_threshold: Minimum cosine similarity score (0-1).
         match_count: Maximum number of results to return.
+        category: Optional category to restrict matches to.
 
     Returns:
-        List of matching documents with similarity scores.
+        List of matching documents with similarity scores (empty on error).
+
+    Raises:
+        httpx.TimeoutException: PostgREST did not answer in time.
     """
-    client = get_supabase_client()
+    params: dict[str, Any] = {
+        "query_embedding": format_vector(query_embedding),
+        "match_threshold": match_threshold,
+        "match_count": match_count,
+    }
+    if category:
+        params["category_filter"] = category
     try:
-        result = client.rpc(
-            "match_documents",
-            {
-                "query_embedding": query_embedding,
-                "match_threshold": match_threshold,
-                "match_count": match_count,
-            },
-        ).execute()
-        return result.data or []
+        response = await get_http_client().post("/rpc/match_documents", json=params)
+        response.raise_for_status()
+        return response.json() or []
+    except httpx.TimeoutException:
+        # Let the caller report a timeout instead of answering without context
+        raise
     except Exception as e:
         logger.error("Vector search failed: %s", e)
         return []
 
 
-def get_content_by_category(category: str) -> list[dict[str, Any]]:
+async def get_content_by_category(category: str) -> list[dict[str, Any]]:
     """Get all content items in a specific category."""
-    client = get_supabase_client()
     try:
-        result = (
-            client.table("tokyo_content")
-            .select("id, title, title_hebrew, content_hebrew, category, subcategory, tags, location_name, latitude, longitude, price_range, recommended_duration, best_time_to_visit")
-            .eq("category", category)
-            .order("title_hebrew")
-            .execute()
+        response = await get_http_client().get(
+            "/tokyo_content",
+            params={
+                "select": CATEGORY_CONTENT_COLUMNS,
+                "category": f"eq.{category}",
+                "order": "title_hebrew",
+            },
         )
-        return result.data or []
+        response.raise_for_status()
+        return response.json() or []
     except Exception as e:
         logger.error("Failed to get content for category '%s': %s", category, e)
         return []
 
 
-def get_all_categories() -> list[dict[str, Any]]:
-    """Get distinct categories with their item counts."""
-    client = get_supabase_client()
+async def get_all_categories() -> list[dict[str, Any]]:
+    """Get distinct categories with their item counts (aggregated server-side by the category_counts RPC)."""
+    global _category_counts_cache
+    now = time.monotonic()
+    if _category_counts_cache is not None and now - _category_counts_cache[0] < CATEGORY_COUNTS_TTL_SECONDS:
+        return _category_counts_cache[1]
+
     try:
-        result = client.table("tokyo_content").select("category").execute()
-        rows = result.data or []
-        # Count items per category
-        counts: dict[str, int] = {}
-        for row in rows:
-            cat = row["category"]
-            counts[cat] = counts.get(cat, 0) + 1
-        return [{"category": cat, "count": count} for cat, count in sorted(counts.items())]
+        response = await get_http_client().post("/rpc/category_counts", json={})
+        response.raise_for_status()
+        categories = response.json() or []
     except Exception as e:
         logger.error("Failed to get categories: %s", e)
         return []
+    _category_counts_cache = (now, categories)
+    return categories
+
 
+async def keyword_search(query: str, category: Optional[str] = None) -> list[dict[str, Any]]:
+    """
+    Full-text keyword search in content.
 
-def keyword_search(query: str, category: Optional[str] = None) -> list[dict[str, Any]]:
-    """Full-text keyword search in content."""
-    client = get_supabase_client()
+    Uses the GIN-indexed tsvector via the keyword_search RPC. Whole-word matching
+    misses partial words (e.g. Hebrew words with a prefix letter attached), so when
+    it finds nothing we fall back to the slower substring scan.
+    """
+    payload: dict[str, Any] = {"q": query, "lim": KEYWORD_SEARCH_LIMIT}
+    if category:
+        payload["cat"] = category
     try:
-        q = client.table("tokyo_content").select(
-            "id, title, title_hebrew, content_hebrew, category, subcategory, tags, location_name"
-        )
-        # Use ilike for simple keyword matching (works for Hebrew and English)
+        response = await get_http_client().post("/rpc/keyword_search", json=payload)
+        response.raise_for_status()
+        results = response.json() or []
+        if results:
+            return results
+
+        # Use ilike for simple substring matching (works for Hebrew and English)
         search_pattern = f"%{query}%"
-        q = q.or_(f"content_hebrew.ilike.{search_pattern},title_hebrew.ilike.{search_pattern},title.ilike.{search_pattern}")
+        params = {
+            "select": KEYWORD_SEARCH_COLUMNS,
+            "or": KEYWORD_SEARCH_OR_FILTER.format(pattern=search_pattern),
+            "limit": str(KEYWORD_SEARCH_LIMIT),
+        }
         if category:
-            q = q.eq("category", category)
-        result = q.limit(20).execute()
-        return result.data or []
+            params["category"] = f"eq.{category}"
+        response = await get_http_client().get("/tokyo_content", params=params)
+        response.raise_for_status()
+        return response.json() or []
     except Exception as e:
         logger.error("Keyword search failed for query '%s': %s", query, e)
         return []
 
 
-def get_session(session_id: str) -> Optional[dict[str, Any]]:
+async def get_session(session_id: str) -> Optional[dict[str, Any]]:
     """Get a chat session by ID."""
-    client = get_supabase_client()
     try:
-        result = client.table("chat_sessions").select("*").eq("id", session_id).single().execute()
-        return result.data
+        response = await get_http_client().get(
+            "/chat_sessions",
+            params={"select": "*", "id": f"eq.{session_id}"},
+            # Single-object response: PostgREST answers 406 unless exactly one row matches
+            headers={"Accept": "application/vnd.pgrst.object+json"},
+        )
+        response.raise_for_status()
+        return response.json()
     except Exception:
         return None
 
 
-def create_session(user_id: str = "anonymous", platform: str = "web") -> str:
+async def create_session(user_id: str = "anonymous", platform: str = "web") -> str:
     """Create a new chat session and return its ID."""
-    client = get_supabase_client()
-    result = client.table("chat_sessions").insert(
-        {"user_id": user_id, "platform": platform, "messages": []}
-    ).execute()
-    return result.data[0]["id"]
+    response = await get_http_client().post(
+        "/chat_sessions",
+        json={"user_id": user_id, "platform": platform, "messages": []},
+        headers={"Prefer": "return=representation"},
+    )
+    response.raise_for_status()
+    return response.json()[0]["id"]
 
 
-def update_session_messages(session_id: str, messages: list[dict[str, str]]) -> None:
-    """Update the messages in a chat session."""
-    client = get_supabase_client()
+async def update_session_messages(session_id: str, messages: list[dict[str, str]]) -> None:
+    """Update the messages in a chat session (failures other than timeouts are logged and ignored)."""
     try:
-        client.table("chat_sessions").update(
-            {"messages": messages, "updated_at": "now()"}
-        ).eq("id", session_id).execute()
+        response = await get_http_client().patch(
+            "/chat_sessions",
+            params={"id": f"eq.{session_id}"},
+            json={"messages": messages, "updated_at": "now()"},
+        )
+        response.raise_for_status()
+    except httpx.TimeoutException:
+        raise
     except Exception as e:
         logger.error("Failed to update session '%s': %s", session_id, e)
+
+
+def _parse_vector(value: Any) -> list[float]:
+    """pgvector columns come back from PostgREST as a '[x,y,...]' string; accept lists too."""
+    if isinstance(value, str):
+        return [float(x) for x in value.strip("[]").split(",")]
+    return list(value)
+
+
+async def get_cached_embedding(text_hash: str, model: str) -> Optional[list[float]]:
+    """Look up a persisted embedding by (text hash, model); None on miss or error."""
+    try:
+        response = await get_http_client().get(
+            "/embedding_cache",
+            params={"select": "embedding", "hash": f"eq.{text_hash}", "model": f"eq.{model}"},
+        )
+        response.raise_for_status()
+        rows = response.json()
+        return _parse_vector(rows[0]["embedding"]) if rows else None
+    except Exception as e:
+        logger.warning("Embedding cache lookup failed: %s", e)
+        return None
+
+
+async def store_cached_embedding(text_hash: str, model: str, embedding: list[float]) -> None:
+    """Persist an embedding; an existing row for the same key is left as is."""
+    try:
+        response = await get_http_client().post(
+            "/embedding_cache",
+            json={"hash": text_hash, "model": model, "embedding": format_vector(embedding)},
+            headers={"Prefer": "resolution=ignore-duplicates,return=minimal"},
+        )
+        response.raise_for_status()
+    except Exception as e:
+        logger.warning("Embedding cache write failed: %s", e)
+
+
+# Hashes per embedding_cache lookup (64-char hex each, sent in the query string)
+EMBEDDING_CACHE_LOOKUP_CHUNK = 100
+
+
+def get_cached_embeddings_batch(text_hashes: list[str], model: str) -> dict[str, list[float]]:
+    """Fetch persisted embeddings for many hashes in one query (sync, for the seeding scripts)."""
+    found: dict[str, list[float]] = {}
+    try:
+        client = get_supabase_client()
+        # Chunk the in.() filter so the request URL stays well under server limits
+        for i in range(0, len(text_hashes), EMBEDDING_CACHE_LOOKUP_CHUNK):
+            result = (
+                client.table("embedding_cache")
+                .select("hash, embedding")
+                .eq("model", model)
+                .in_("hash", text_hashes[i : i + EMBEDDING_CACHE_LOOKUP_CHUNK])
+                .execute()
+            )
+            found.update((row["hash"], _parse_vector(row["embedding"])) for row in result.data or [])
+    except Exception as e:
+        logger.warning("Embedding cache batch lookup failed: %s", e)
+    return found
+
+
+def store_cached_embeddings_batch(rows: list[dict[str, Any]]) -> None:
+    """Upsert many {hash, model, embedding} rows (sync, for the seeding scripts)."""
+    if not rows:
+        return
+    try:
+        get_supabase_client().table("embedding_cache").upsert(rows, ignore_duplicates=True).execute()
+    except Exception as e:
+        logger.warning("Embedding cache batch write failed: %s", e)
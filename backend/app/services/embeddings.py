@@ -2,21 +2,96 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import logging
 import os
+import random
+import threading
+import time
+from collections import OrderedDict
 from typing import Optional
 
+import httpx
+import numpy as np
+from fastapi import Request
+
 from app.config import settings
+from app.services.database import (
+    format_vector,
+    get_cached_embedding,
+    get_cached_embeddings_batch,
+    store_cached_embedding,
+    store_cached_embeddings_batch,
+)
 
 logger = logging.getLogger(__name__)
 
 # Hugging Face API settings
 HF_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+EMBEDDING_DIM = 384
+HF_API_URL = f"https://router.huggingface.co/hf-inference/models/{HF_MODEL}/pipeline/feature-extraction"
+
+# Dynamically quantized ONNX graph published alongside the model on the hub
+ONNX_INT8_FILE = "onnx/model_qint8_avx512_vnni.onnx"
+
+# Upper bound on torch intra-op threads for the local model
+TORCH_MAX_THREADS = 4
 
 # Module state (initialized in load_model)
 _model = None
-_hf_client = None
+_hf_client: Optional[httpx.Client] = None
+_hf_async_client: Optional[httpx.AsyncClient] = None
 _use_api = False
+# Precision/provider the local model actually runs with, e.g. "int8-cpu" or "onnx-fp32-cuda"
+_model_variant: Optional[str] = None
+
+# Query embedding cache: bounded LRU of text -> embedding (tuples so cached vectors stay immutable)
+EMBEDDING_CACHE_SIZE = 2048
+_embedding_cache: OrderedDict[str, tuple[float, ...]] = OrderedDict()
+_embedding_cache_lock = threading.Lock()
+# In-flight async encodes, so concurrent identical questions share one embedding call
+_inflight: dict[str, asyncio.Task] = {}
+# Fire-and-forget writes to the persistent cache (referenced so they aren't garbage-collected mid-flight)
+_background_writes: set[asyncio.Task] = set()
+
+
+def _normalize(text: str) -> str:
+    """Collapse runs of whitespace so trivially different spellings of a question share a cache entry."""
+    return " ".join(text.split())
+
+
+def _text_hash(text: str) -> str:
+    """Key for the persistent (Postgres) embedding cache."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _cache_model_id() -> str:
+    """Identify the embedding source, since vectors from different providers/precisions aren't interchangeable."""
+    if _use_api:
+        return f"hf-api:{HF_MODEL}"
+    # Key on the resolved variant: "auto" means fp16 on a GPU but int8 on a CPU
+    variant = _model_variant or f"{settings.embedding_backend}:{settings.embedding_precision}"
+    return f"local:{settings.embedding_model_name}:{variant}"
+
+
+def _cache_get(text: str) -> Optional[list[float]]:
+    """Return a cached embedding for `text` (and mark it recently used), or None."""
+    with _embedding_cache_lock:
+        embedding = _embedding_cache.get(text)
+        if embedding is None:
+            return None
+        _embedding_cache.move_to_end(text)
+    return list(embedding)
+
+
+def _cache_put(text: str, embedding: list[float]) -> None:
+    """Store an embedding, evicting the least recently used entry when full."""
+    with _embedding_cache_lock:
+        _embedding_cache[text] = tuple(embedding)
+        _embedding_cache.move_to_end(text)
+        if len(_embedding_cache) > EMBEDDING_CACHE_SIZE:
+            _embedding_cache.popitem(last=False)
 
 
 def load_model():
@@ -25,63 +100,215 @@ def load_model():
     Uses Hugging Face API if HF_API_TOKEN is set (for low-memory environments).
     Falls back to local model for development.
     """
-    global _model, _hf_client, _use_api
+    global _model, _hf_client, _hf_async_client, _use_api, _model_variant
     
+    # Embeddings from a previous model/provider are not interchangeable
+    with _embedding_cache_lock:
+        _embedding_cache.clear()
+
     # Check token at runtime, not module load time
     hf_token = os.getenv("HF_API_TOKEN", "")
     
     if hf_token:
         logger.info("Using Hugging Face Inference API for embeddings (low memory mode)")
-        from huggingface_hub import InferenceClient
-        _hf_client = InferenceClient(provider="hf-inference", api_key=hf_token)
+        # Long-lived pooled HTTP/2 clients: one TLS handshake, then keep-alive for every call.
+        # The sync client serves the seeding scripts, the async one the request path.
+        client_options = dict(
+            headers={"Authorization": f"Bearer {hf_token}"},
+            http2=True,
+            timeout=httpx.Timeout(120, connect=10),
+            limits=httpx.Limits(max_keepalive_connections=10, max_connections=20),
+        )
+        if _hf_client is not None:
+            _hf_client.close()
+        _hf_client = httpx.Client(**client_options)
+        _hf_async_client = httpx.AsyncClient(**client_options)
         _use_api = True
-        logger.info("HF InferenceClient initialized successfully")
+        logger.info("HF Inference API clients initialized successfully")
         return None
     
     # Local mode - load sentence-transformers
+    _model_variant = None
     logger.info("Loading local embedding model: %s ...", settings.embedding_model_name)
+    import torch
     from sentence_transformers import SentenceTransformer
-    _model = SentenceTransformer(settings.embedding_model_name)
+    # Cap intra-op threads: concurrent requests each encode in their own worker thread,
+    # and letting every one of them fan out over all cores just thrashes
+    torch.set_num_threads(min(TORCH_MAX_THREADS, os.cpu_count() or 1))
+    if settings.embedding_backend == "onnx":
+        _model = _load_onnx_model(settings.embedding_model_name, settings.embedding_precision)
+    else:
+        _model = _apply_precision(SentenceTransformer(settings.embedding_model_name), settings.embedding_precision)
     logger.info("Embedding model loaded successfully (dim=%d)", _model.get_sentence_embedding_dimension())
     _use_api = False
     return _model
 
 
+def _load_onnx_model(model_name: str, precision: str):
+    """
+    Load the model on ONNX Runtime, on the GPU when a CUDA build of onnxruntime is installed.
+
+    On CPU we prefer the hub's dynamically quantized INT8 graph. That file targets
+    AVX-512 VNNI; if it isn't available for this model we fall back to the FP32 ONNX
+    export, which still gets ONNX Runtime's graph optimizations. The INT8 graph is
+    CPU-only, so on CUDA the FP32 export is used directly.
+    """
+    import onnxruntime
+    from sentence_transformers import SentenceTransformer
+
+    on_gpu = "CUDAExecutionProvider" in onnxruntime.get_available_providers()
+    model_kwargs = {"provider": "CUDAExecutionProvider" if on_gpu else "CPUExecutionProvider"}
+    if not on_gpu and precision in ("auto", "int8"):
+        try:
+            model = SentenceTransformer(
+                model_name, backend="onnx", model_kwargs={**model_kwargs, "file_name": ONNX_INT8_FILE}
+            )
+            _set_model_variant("onnx-int8-cpu")
+            return model
+        except Exception as e:
+            logger.warning("INT8 ONNX model unavailable (%s); using FP32 ONNX", e)
+    model = SentenceTransformer(model_name, backend="onnx", model_kwargs=model_kwargs)
+    _set_model_variant(f"onnx-fp32-{'cuda' if on_gpu else 'cpu'}")
+    return model
+
+
+def _set_model_variant(variant: str) -> None:
+    """Record (and log) the precision/provider the local model ended up with."""
+    global _model_variant
+    _model_variant = variant
+    logger.info("Embedding model precision: %s", variant)
+
+
+def _apply_precision(model, precision: str):
+    """
+    Convert the local model to reduced precision to cut memory and speed up inference.
+
+    On GPU the weights are cast to FP16; on CPU the Linear layers are dynamically
+    quantized to INT8 (weights stored as int8, activations quantized per batch).
+    """
+    import torch
+
+    if precision == "auto":
+        precision = "fp16" if model.device.type == "cuda" else "int8"
+
+    device = model.device.type
+    if precision == "fp16" and device != "cuda":
+        logger.warning("FP16 requested but model is on %s; keeping FP32", model.device)
+        precision = "fp32"
+    elif precision == "int8" and device != "cpu":
+        logger.warning("INT8 dynamic quantization is CPU-only; keeping model on %s as-is", model.device)
+        precision = "fp32"
+    elif precision not in ("fp16", "int8", "fp32"):
+        logger.warning("Unknown embedding precision '%s'; keeping FP32", precision)
+        precision = "fp32"
+
+    if precision == "fp16":
+        model = model.half()
+    elif precision == "int8":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    _set_model_variant(f"{precision}-{device}")
+    return model
+
+
+async def ensure_model_ready(request: Request) -> None:
+    """
+    FastAPI dependency: wait for the background model load started in lifespan.
+
+    The first request after startup pays the load cost instead of the deploy.
+    """
+    task: Optional[asyncio.Task] = getattr(request.app.state, "model_task", None)
+    if task is not None and not task.done():
+        try:
+            # Shield so a cancelled request doesn't cancel the shared load task
+            await asyncio.shield(task)
+        except Exception as e:
+            # Leave the error to encode_text ("model not loaded") so callers map it as usual
+            logger.error("Background embedding model load failed: %s", e)
+
+
+async def close_hf_clients() -> None:
+    """Close the HF Inference API connection pools (called on application shutdown)."""
+    global _hf_client, _hf_async_client
+    if _hf_async_client is not None:
+        await _hf_async_client.aclose()
+        _hf_async_client = None
+    if _hf_client is not None:
+        _hf_client.close()
+        _hf_client = None
+
+
 def get_model():
     """Get the loaded model instance. Returns None if using API mode."""
     return _model
 
 
+# HF retry backoff: base * 2**attempt (capped) plus jitter, in seconds
+HF_RETRY_BASE_DELAY = 0.25
+HF_RETRY_MAX_DELAY = 8.0
+HF_RETRY_JITTER = 0.25
+# Transient statuses worth retrying (rate limit, model loading/overloaded)
+HF_RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def _retry_delay(attempt: int) -> float:
+    """Exponential backoff with jitter: ~0.25s, 0.5s, 1s, ... up to 8s."""
+    return min(HF_RETRY_MAX_DELAY, HF_RETRY_BASE_DELAY * (2**attempt)) + random.uniform(0, HF_RETRY_JITTER)
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Retry transport errors and transient statuses; client errors (bad token, bad input) fail fast."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in HF_RETRYABLE_STATUSES
+    return isinstance(error, httpx.TransportError)
+
+
 def _call_hf_api(texts: list[str], retries: int = 3) -> list[list[float]]:
-    """Call Hugging Face Inference API for embeddings with retry logic."""
-    import time
-    
+    """
+    Call Hugging Face Inference API for embeddings with retry logic.
+
+    Blocking (uses time.sleep between retries): only for the sync encode_text /
+    encode_batch used by scripts. The request path uses _call_hf_api_async.
+    """
     for attempt in range(retries):
         try:
-            # Use the HuggingFace Hub client
-            if len(texts) == 1:
-                result = _hf_client.feature_extraction(texts[0], model=HF_MODEL)
-                # Convert numpy float32 to Python float for JSON serialization
-                return [[float(x) for x in result]]
-            else:
-                # Process multiple texts
-                results = []
-                for text in texts:
-                    embedding = _hf_client.feature_extraction(text, model=HF_MODEL)
-                    # Convert numpy float32 to Python float
-                    results.append([float(x) for x in embedding])
-                return results
-                
+            # One POST for all texts; the pipeline returns one pooled vector per input
+            response = _hf_client.post(HF_API_URL, json={"inputs": texts})
+            response.raise_for_status()
+            return response.json()
+
         except Exception as e:
             error_msg = str(e)
             logger.warning("HF API error (attempt %d/%d): %s", attempt + 1, retries, error_msg)
             
-            if attempt < retries - 1:
-                wait_time = 5 * (attempt + 1)  # Exponential backoff
-                logger.info("Retrying in %d seconds...", wait_time)
+            if attempt < retries - 1 and _is_retryable(e):
+                wait_time = _retry_delay(attempt)
+                logger.info("Retrying in %.2f seconds...", wait_time)
                 time.sleep(wait_time)
                 continue
-            raise RuntimeError(f"HF API failed after {retries} attempts: {error_msg}")
+            raise RuntimeError(f"HF API failed after {attempt + 1} attempts: {error_msg}") from e
+
+
+async def _call_hf_api_async(texts: list[str], retries: int = 3) -> list[list[float]]:
+    """Call Hugging Face Inference API for all texts in one request, with retry logic."""
+    for attempt in range(retries):
+        try:
+            response = await _hf_async_client.post(HF_API_URL, json={"inputs": texts})
+            response.raise_for_status()
+            return response.json()
+
+        except Exception as e:
+            error_msg = str(e)
+            logger.warning("HF API error (attempt %d/%d): %s", attempt + 1, retries, error_msg)
+
+            if attempt < retries - 1 and _is_retryable(e):
+                wait_time = _retry_delay(attempt)
+                logger.info("Retrying in %.2f seconds...", wait_time)
+                # Non-blocking: other requests keep flowing during the backoff
+                await asyncio.sleep(wait_time)
+                continue
+            # Chained, so callers can still tell a timeout from other failures
+            raise RuntimeError(f"HF API failed after {attempt + 1} attempts: {error_msg}") from e
 
 
 def encode_text(text: str) -> list[float]:
@@ -94,38 +321,154 @@ def encode_text(text: str) -> list[float]:
     Returns:
         List of 384 floats representing the text embedding.
     """
+    text = _normalize(text)
+    cached = _cache_get(text)
+    if cached is not None:
+        return cached
+
     if _use_api:
-        result = _call_hf_api([text])
-        return result[0]
-    
+        embedding = _call_hf_api([text])[0]
+    else:
+        embedding = _encode_local(text)
+    _cache_put(text, embedding)
+    return embedding
+
+
+def _encode_local(text: str) -> list[float]:
+    """Run the local model forward pass for a single text."""
     if _model is None:
         raise RuntimeError("Embedding model not loaded. Call load_model() first.")
-    embedding = _model.encode(text, normalize_embeddings=True)
+    import torch
+
+    # inference_mode skips autograd bookkeeping entirely (cheaper than the no_grad encode uses)
+    with torch.inference_mode():
+        embedding = _model.encode(text, normalize_embeddings=True, convert_to_numpy=True)
     return embedding.tolist()
 
 
-def encode_batch(texts: list[str], batch_size: int = 32) -> list[list[float]]:
+async def _encode_and_cache_async(text: str) -> list[float]:
+    """
+    Resolve an in-process cache miss: check the persistent cache, else compute the
+    embedding without blocking the event loop and persist it in the background.
+    """
+    text_hash, model_id = _text_hash(text), _cache_model_id()
+    embedding = await get_cached_embedding(text_hash, model_id)
+    if embedding is None:
+        if _use_api:
+            embedding = (await _call_hf_api_async([text]))[0]
+        else:
+            embedding = await asyncio.to_thread(_encode_local, text)
+        task = asyncio.create_task(store_cached_embedding(text_hash, model_id, embedding))
+        _background_writes.add(task)
+        task.add_done_callback(_background_writes.discard)
+    _cache_put(text, embedding)
+    return embedding
+
+
+async def encode_text_async(text: str) -> list[float]:
+    """
+    Async variant of encode_text for the request path.
+
+    Served from the LRU cache when possible; otherwise API mode awaits the
+    async HF client and local mode runs the forward pass in a worker thread.
+    Concurrent calls for the same text share a single computation.
+    """
+    text = _normalize(text)
+    cached = _cache_get(text)
+    if cached is not None:
+        return cached
+
+    task = _inflight.get(text)
+    if task is None:
+        task = asyncio.create_task(_encode_and_cache_async(text))
+        _inflight[text] = task
+        task.add_done_callback(lambda _: _inflight.pop(text, None))
+    # Shield so one cancelled request doesn't cancel the computation others wait on
+    return list(await asyncio.shield(task))
+
+
+async def warm_embedding_cache(texts: list[str]) -> None:
+    """Pre-compute embeddings for known popular questions; failures are only logged."""
+    results = await asyncio.gather(*(encode_text_async(text) for text in texts), return_exceptions=True)
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    if failed:
+        logger.warning("Embedding cache warm-up: %d/%d texts failed", failed, len(texts))
+    else:
+        logger.info("Embedding cache warmed with %d texts", len(texts))
+
+
+def encode_batch(texts: list[str], batch_size: int = 32) -> np.ndarray:
     """
     Generate embeddings for a batch of texts.
 
+    Texts already in the in-process or persistent embedding cache are served
+    from it; only the misses are sent to the model/API (and persisted), and
+    results are stitched back in input order.
+
     Args:
         texts: List of input texts.
         batch_size: Number of texts to process at once.
 
     Returns:
-        List of embedding vectors.
+        float32 array of shape (len(texts), 384). Rows are rendered with
+        `format_vector` only at the PostgREST boundary.
     """
+    keys = [_normalize(text) for text in texts]
+    embeddings = np.empty((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    miss_indices = []
+    for i, key in enumerate(keys):
+        cached = _cache_get(key)
+        if cached is None:
+            miss_indices.append(i)
+        else:
+            embeddings[i] = cached
+
+    if miss_indices:
+        model_id = _cache_model_id()
+        hashes = {i: _text_hash(keys[i]) for i in miss_indices}
+        persisted = get_cached_embeddings_batch(list(set(hashes.values())), model_id)
+        still_missing = []
+        for i in miss_indices:
+            embedding = persisted.get(hashes[i])
+            if embedding is None:
+                still_missing.append(i)
+            else:
+                embeddings[i] = embedding
+        miss_indices = still_missing
+
+    if miss_indices:
+        # Identical texts (e.g. a place quoted in several sections) go to the model once
+        unique_keys = list(dict.fromkeys(keys[i] for i in miss_indices))
+        position = {key: n for n, key in enumerate(unique_keys)}
+        computed = _encode_batch_uncached(unique_keys, batch_size)
+        embeddings[miss_indices] = computed[[position[keys[i]] for i in miss_indices]]
+        new_rows = {
+            hashes[i]: {"hash": hashes[i], "model": model_id, "embedding": format_vector(embeddings[i])}
+            for i in miss_indices
+        }
+        store_cached_embeddings_batch(list(new_rows.values()))
+    if len(miss_indices) < len(texts):
+        logger.info("Embedding cache hits: %d/%d", len(texts) - len(miss_indices), len(texts))
+    return embeddings
+
+
+def _encode_batch_uncached(texts: list[str], batch_size: int) -> np.ndarray:
+    """Embed `texts` with the HF API or local model, bypassing the cache."""
     if _use_api:
-        # Process in batches to avoid API limits
-        all_embeddings = []
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            embeddings = _call_hf_api(batch)
-            all_embeddings.extend(embeddings)
+        # Process in batches to avoid API limits. Batch in length order so each request
+        # groups similar-length texts (less padding server-side), then scatter back.
+        order = sorted(range(len(texts)), key=lambda idx: len(texts[idx]))
+        all_embeddings = np.empty((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        for i in range(0, len(order), batch_size):
+            batch_indices = order[i:i + batch_size]
+            batch = [texts[idx] for idx in batch_indices]
+            all_embeddings[batch_indices] = np.asarray(_call_hf_api(batch), dtype=np.float32)
             logger.info("Processed batch %d-%d via HF API", i, i + len(batch))
         return all_embeddings
     
+    # sentence-transformers already length-sorts inside encode() and restores input order
     if _model is None:
         raise RuntimeError("Embedding model not loaded. Call load_model() first.")
-    embeddings = _model.encode(texts, batch_size=batch_size, normalize_embeddings=True, show_progress_bar=True)
-    return [emb.tolist() for emb in embeddings]
+    return _model.encode(
+        texts, batch_size=batch_size, normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=True
+    ).astype(np.float32, copy=False)
@@ -2,17 +2,25 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
-from typing import Optional
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
 
-from groq import Groq
+import httpx
+from groq import AsyncGroq
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
-# Singleton client
-_client: Optional[Groq] = None
+# Singleton client, sharing one pooled HTTP/2 connection to api.groq.com across chats
+_client: Optional[AsyncGroq] = None
+_http_client: Optional[httpx.AsyncClient] = None
+# Guards singleton creation so racing callers can't each open (and leak) a connection pool
+_client_lock = threading.Lock()
 
 # System prompt for the Tokyo travel guide assistant
 SYSTEM_PROMPT_TEMPLATE = """אתה מדריך טיולים מומחה לטוקיו, יפן. אתה עונה על שאלות בעברית בצורה ידידותית, מדויקת ומפורטת.
@@ -32,19 +40,108 @@ SYSTEM_PROMPT_TEMPLATE = """אתה מדריך טיולים מומחה לטוקי
 8. שמור על תשובות תמציתיות וממוקדות. אל תחזור על אותו מידע.
 """
 
+# Fallback context when retrieval found nothing
+NO_CONTEXT_TEXT = "אין מידע ספציפי זמין."
 
-def get_groq_client() -> Groq:
-    """Get or create the Groq client singleton."""
-    global _client
+# Pre-split template (joined per request instead of re-parsing the format string) and the
+# constant no-context prompt, rendered once
+_SYSTEM_PROMPT_PREFIX, _SYSTEM_PROMPT_SUFFIX = SYSTEM_PROMPT_TEMPLATE.split("{context}")
+_EMPTY_CONTEXT_SYSTEM_PROMPT = SYSTEM_PROMPT_TEMPLATE.format(context=NO_CONTEXT_TEXT)
+
+# Appended to the system prompt when the answer and follow-up questions come from one JSON-mode call
+JSON_OUTPUT_INSTRUCTIONS = """
+פורמט התשובה:
+החזר אובייקט JSON בלבד, במבנה: {"answer": "<התשובה>", "suggestions": ["<שאלה>", "<שאלה>", "<שאלה>"]}
+- answer: התשובה למשתמש, לפי ההנחיות למעלה.
+- suggestions: בדיוק 3 שאלות המשך קצרות ורלוונטיות, באותה שפה כמו התשובה.
+"""
+
+# Prior-conversation allowance per request, estimated at ~3 chars per token (mixed Hebrew/English)
+HISTORY_TOKEN_BUDGET = 1500
+HISTORY_CHARS_PER_TOKEN = 3
+
+# Canned answers and follow-ups used when the LLM call fails or returns nothing usable
+EMPTY_ANSWER_TEXT = "מצטער, לא הצלחתי ליצור תשובה. נסה שוב."
+ERROR_ANSWER_TEXT = "מצטער, אירעה שגיאה בעיבוד השאלה. נסה שוב בעוד רגע."
+FALLBACK_SUGGESTIONS = [
+    "מה כדאי לאכול בטוקיו?",
+    "איך להתנייד בתחבורה ציבורית?",
+    "אילו שכונות מומלצות לביקור?",
+]
+
+# LRU of generated follow-ups keyed by (normalized question, answer digest); repeat turns skip the Groq call
+SUGGESTIONS_CACHE_SIZE = 2048
+_suggestions_cache: OrderedDict[tuple[str, str], tuple[str, ...]] = OrderedDict()
+
+
+def get_groq_client() -> AsyncGroq:
+    """
+    Get or create the async Groq client singleton.
+
+    The client runs on a keep-alive HTTP/2 connection pool, so consecutive and
+    concurrent chats reuse the TLS connection instead of handshaking per call.
+    """
+    global _client, _http_client
     if _client is None:
-        if not settings.groq_api_key:
-            raise RuntimeError("GROQ_API_KEY must be set in environment variables")
-        _client = Groq(api_key=settings.groq_api_key)
-        logger.info("Groq client initialized (model: %s)", settings.groq_model_name)
+        with _client_lock:
+            if _client is None:
+                if not settings.groq_api_key:
+                    raise RuntimeError("GROQ_API_KEY must be set in environment variables")
+                _http_client = httpx.AsyncClient(
+                    http2=True,
+                    timeout=30.0,
+                    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+                )
+                _client = AsyncGroq(api_key=settings.groq_api_key, http_client=_http_client)
+                logger.info("Groq client initialized (model: %s)", settings.groq_model_name)
     return _client
 
 
-def generate_response(
+async def close_groq_client() -> None:
+    """Close the Groq client's connection pool (called on application shutdown)."""
+    global _client, _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+    _client = None
+    _http_client = None
+
+
+def _trim_history(history: list[dict[str, str]], max_tokens: int = HISTORY_TOKEN_BUDGET) -> list[dict[str, str]]:
+    """Keep the most recent messages whose estimated token count fits within `max_tokens`."""
+    total = 0
+    start = len(history)
+    while start > 0:
+        cost = len(history[start - 1].get("content", "")) // HISTORY_CHARS_PER_TOKEN + 1
+        if total + cost > max_tokens:
+            break
+        total += cost
+        start -= 1
+    return history[start:]
+
+
+def _build_messages(
+    context: str,
+    question: str,
+    chat_history: list[dict[str, str]] | None,
+    system_suffix: str = "",
+) -> list[dict[str, str]]:
+    """Assemble the system prompt (with RAG context), recent history and the user's question."""
+    if context:
+        system_message = "".join((_SYSTEM_PROMPT_PREFIX, context, _SYSTEM_PROMPT_SUFFIX, system_suffix))
+    else:
+        system_message = _EMPTY_CONTEXT_SYSTEM_PROMPT + system_suffix
+
+    messages = [{"role": "system", "content": system_message}]
+
+    # Add as much recent chat history as fits the token budget
+    if chat_history:
+        messages.extend(_trim_history(chat_history))
+
+    messages.append({"role": "user", "content": question})
+    return messages
+
+
+async def generate_response(
     context: str,
     question: str,
     chat_history: list[dict[str, str]] | None = None,
@@ -61,43 +158,147 @@ def generate_response(
         The generated answer text.
     """
     client = get_groq_client()
+    messages = _build_messages(context, question, chat_history)
 
-    system_message = SYSTEM_PROMPT_TEMPLATE.format(context=context if context else "אין מידע ספציפי זמין.")
+    try:
+        response = await client.chat.completions.create(
+            model=settings.groq_model_name,
+            messages=messages,
+            temperature=settings.rag_temperature,
+            max_tokens=settings.rag_max_completion_tokens,
+            top_p=settings.rag_top_p,
+            stream=False,
+        )
+        answer = response.choices[0].message.content
+        return answer or EMPTY_ANSWER_TEXT
+    except Exception as e:
+        logger.error("Groq API call failed: %s", e)
+        return ERROR_ANSWER_TEXT
 
-    messages = [{"role": "system", "content": system_message}]
 
-    # Add chat history (keep last 6 messages to stay within context limits)
-    if chat_history:
-        messages.extend(chat_history[-6:])
+async def generate_response_stream(
+    context: str,
+    question: str,
+    chat_history: list[dict[str, str]] | None = None,
+) -> AsyncIterator[str]:
+    """
+    Stream the answer from Groq, yielding content deltas as they arrive.
 
-    messages.append({"role": "user", "content": question})
+    Only message content is forwarded; reasoning deltas from gpt-oss are dropped.
+    If the call fails before any text was sent, the error text is yielded instead.
 
+    Args:
+        context: Relevant content retrieved from the vector database.
+        question: The user's question.
+        chat_history: Optional list of previous messages.
+
+    Yields:
+        Consecutive pieces of the answer text.
+    """
+    client = get_groq_client()
+    messages = _build_messages(context, question, chat_history)
+
+    sent_any = False
     try:
-        response = client.chat.completions.create(
+        stream = await client.chat.completions.create(
             model=settings.groq_model_name,
             messages=messages,
             temperature=settings.rag_temperature,
             max_tokens=settings.rag_max_completion_tokens,
             top_p=settings.rag_top_p,
+            stream=True,
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                sent_any = True
+                yield delta
+    except Exception as e:
+        logger.error("Groq streaming call failed: %s", e)
+        if not sent_any:
+            yield ERROR_ANSWER_TEXT
+        return
+    if not sent_any:
+        yield EMPTY_ANSWER_TEXT
+
+
+def _parse_answer_with_suggestions(raw: str) -> tuple[str, list[str]]:
+    """Split a JSON-mode completion into (answer, suggestions), tolerating a malformed payload."""
+    try:
+        payload = json.loads(raw)
+    except ValueError:
+        # Not JSON after all: the text itself is the best answer we have
+        return raw.strip() or EMPTY_ANSWER_TEXT, list(FALLBACK_SUGGESTIONS)
+    if not isinstance(payload, dict):
+        return EMPTY_ANSWER_TEXT, list(FALLBACK_SUGGESTIONS)
+
+    answer = payload.get("answer")
+    answer = answer.strip() if isinstance(answer, str) else ""
+    suggestions = payload.get("suggestions")
+    if isinstance(suggestions, list):
+        suggestions = [s.strip() for s in suggestions if isinstance(s, str) and s.strip()][:3]
+    return answer or EMPTY_ANSWER_TEXT, suggestions or list(FALLBACK_SUGGESTIONS)
+
+
+async def generate_response_with_suggestions(
+    context: str,
+    question: str,
+    chat_history: list[dict[str, str]] | None = None,
+) -> tuple[str, list[str]]:
+    """
+    Generate the answer and its follow-up questions in a single JSON-mode Groq call.
+
+    Saves the separate round trip of generate_suggested_questions on every chat turn.
+
+    Args:
+        context: Relevant content retrieved from the vector database.
+        question: The user's question.
+        chat_history: Optional list of previous messages.
+
+    Returns:
+        Tuple of (answer text, up to 3 suggested questions).
+    """
+    client = get_groq_client()
+    messages = _build_messages(context, question, chat_history, JSON_OUTPUT_INSTRUCTIONS)
+
+    try:
+        response = await client.chat.completions.create(
+            model=settings.groq_model_name,
+            messages=messages,
+            temperature=settings.rag_temperature,
+            max_tokens=settings.rag_max_completion_tokens,
+            top_p=settings.rag_top_p,
+            response_format={"type": "json_object"},
             stream=False,
         )
-        answer = response.choices[0].message.content
-        return answer or "מצטער, לא הצלחתי ליצור תשובה. נסה שוב."
+        return _parse_answer_with_suggestions(response.choices[0].message.content or "")
     except Exception as e:
         logger.error("Groq API call failed: %s", e)
-        return "מצטער, אירעה שגיאה בעיבוד השאלה. נסה שוב בעוד רגע."
+        return ERROR_ANSWER_TEXT, list(FALLBACK_SUGGESTIONS)
 
 
-def generate_suggested_questions(question: str, answer: str) -> list[str]:
+async def generate_suggested_questions(question: str, answer: str) -> list[str]:
     """
     Generate follow-up question suggestions based on the conversation.
 
     Returns a list of 3 suggested questions in Hebrew.
     """
+    # Nothing to follow up on after a failed answer
+    if answer.startswith((ERROR_ANSWER_TEXT, EMPTY_ANSWER_TEXT)):
+        return list(FALLBACK_SUGGESTIONS)
+
+    key = (" ".join(question.lower().split()), hashlib.blake2b(answer.encode(), digest_size=8).hexdigest())
+    cached = _suggestions_cache.get(key)
+    if cached is not None:
+        _suggestions_cache.move_to_end(key)
+        return list(cached)
+
     client = get_groq_client()
 
     try:
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model=settings.groq_model_name,
             messages=[
                 {
@@ -116,12 +317,12 @@ def generate_suggested_questions(question: str, answer: str) -> list[str]:
             stream=False,
         )
         raw = response.choices[0].message.content or ""
-        suggestions = [line.strip() for line in raw.strip().split("\n") if line.strip()]
-        return suggestions[:3]
+        suggestions = [line.strip() for line in raw.strip().split("\n") if line.strip()][:3]
     except Exception as e:
         logger.error("Failed to generate suggestions: %s", e)
-        return [
-            "מה כדאי לאכול בטוקיו?",
-            "איך להתנייד בתחבורה ציבורית?",
-            "אילו שכונות מומלצות לביקור?",
-        ]
+        return list(FALLBACK_SUGGESTIONS)
+
+    _suggestions_cache[key] = tuple(suggestions)
+    if len(_suggestions_cache) > SUGGESTIONS_CACHE_SIZE:
+        _suggestions_cache.popitem(last=False)
+    return suggestions
@@ -2,8 +2,11 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Optional
+from typing import Any, AsyncIterator, Awaitable, Optional, TypeVar
+
+import httpx
 
 from app.config import settings
 from app.models import ChatResponse, SourceReference
@@ -13,55 +16,161 @@ from app.services.database import (
     update_session_messages,
     vector_search,
 )
-from app.services.embeddings import encode_text
-from app.services.groq_client import generate_response, generate_suggested_questions
+from app.services.embeddings import encode_text_async
+from app.services.groq_client import (
+    generate_response_stream,
+    generate_response_with_suggestions,
+    generate_suggested_questions,
+)
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
 
-async def answer_question(
+# Rough chars-per-token for the mixed Hebrew/English content (Hebrew alone runs ~2-3)
+CHARS_PER_TOKEN = 3
+# Hard per-source cap, so one long section can't crowd out the others
+MAX_CONTENT_CHARS_PER_SOURCE = 2000
+# Near-duplicate detection: sources with the same title whose content starts the same are treated as one
+DEDUPE_PREFIX_CHARS = 128
+# After MIN_SOURCES sources, stop at matches weaker than LOW_SIGNAL_RATIO x the best similarity
+MIN_SOURCES = 3
+LOW_SIGNAL_RATIO = 0.75
+# Where a truncated source may end (sentence/line boundaries, incl. Hebrew sof pasuq)
+_SENTENCE_ENDS = (". ", "! ", "? ", "\n", "׃")
+
+
+def _estimate_tokens(text: str) -> int:
+    """Cheap token-count estimate; good enough for budgeting without loading a tokenizer."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _trim_at_sentence(text: str, max_chars: int) -> str:
+    """Cut `text` to at most `max_chars`, preferring the last sentence boundary over a mid-word cut."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundary = max(cut.rfind(end) for end in _SENTENCE_ENDS)
+    # Only use the boundary if it keeps at least half of the allowance
+    if boundary >= max_chars // 2:
+        return cut[: boundary + 1].rstrip()
+    return cut + "..."
+
+
+class RagError(Exception):
+    """Base class for failures in the RAG pipeline that map to a specific HTTP error."""
+
+
+class RagTimeout(RagError):
+    """An upstream service (embeddings, database) timed out."""
+
+
+class RagEmbedError(RagError):
+    """The question could not be embedded (HF API or local model unavailable)."""
+
+
+class RagLLMError(RagError):
+    """The Groq LLM could not be reached or configured."""
+
+
+async def _embed_question(question: str) -> list[float]:
+    """Embed the question, translating failures into typed pipeline errors."""
+    try:
+        return await encode_text_async(question)
+    except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+        raise RagTimeout(str(e)) from e
+    except Exception as e:
+        # The HF client gives up with a RuntimeError chained to the last attempt's error
+        if isinstance(e.__cause__, httpx.TimeoutException):
+            raise RagTimeout(str(e)) from e
+        raise RagEmbedError(str(e)) from e
+
+
+async def _no_session() -> None:
+    """Placeholder for the session lookup when the client didn't send a session ID."""
+    return None
+
+
+async def _db_call(call: Awaitable[T]) -> T:
+    """Await a database call, translating timeouts into a typed pipeline error."""
+    try:
+        return await call
+    except httpx.TimeoutException as e:
+        raise RagTimeout(str(e)) from e
+
+
+async def _new_session(user_id: str, platform: str) -> str:
+    """Create a chat session, translating timeouts into a typed pipeline error."""
+    return await _db_call(create_session(user_id=user_id, platform=platform))
+
+
+async def _prepare_turn(
     question: str,
-    session_id: Optional[str] = None,
-    platform: str = "web",
-    user_id: str = "anonymous",
-) -> ChatResponse:
+    session_id: Optional[str],
+    platform: str,
+    user_id: str,
+) -> tuple[str, list[SourceReference], str, list[dict[str, str]]]:
     """
-    Full RAG pipeline: embed question -> vector search -> build context -> generate answer.
-
-    Args:
-        question: The user's question in Hebrew or English.
-        session_id: Optional existing session ID for conversation continuity.
-        platform: Client platform identifier (default 'web').
-        user_id: User identifier (default 'anonymous').
+    Steps shared by the blocking and streaming pipelines: embed, retrieve, build context, resolve the session.
 
     Returns:
-        ChatResponse with answer, sources, session_id, and suggested questions.
+        Tuple of (context text, source references, session ID, prior chat history).
     """
-    # 1. Generate embedding for the question
+    # 1. Generate embedding for the question, fetching the prior session concurrently
     logger.info("Processing question: %s", question[:80])
-    question_embedding = encode_text(question)
+    question_embedding, session = await asyncio.gather(
+        _embed_question(question),
+        get_session(session_id) if session_id else _no_session(),
+    )
 
-    # 2. Search for similar content in the database
-    search_results = vector_search(
-        query_embedding=question_embedding,
-        match_threshold=settings.rag_match_threshold,
-        match_count=settings.rag_match_count,
+    # 2. Search for similar content in the database; if there's no usable session, create one meanwhile
+    search_results, new_session_id = await asyncio.gather(
+        _db_call(
+            vector_search(
+                query_embedding=question_embedding,
+                match_threshold=settings.rag_match_threshold,
+                match_count=settings.rag_match_count,
+            )
+        ),
+        _new_session(user_id, platform) if not session else _no_session(),
     )
 
-    # 3. Build context from search results (128K context allows full content)
-    max_content_per_source = 2000  # Generous limit per source with 128K context window
+    # 3. Build context from search results, most similar first, until the token budget is spent
     context_parts = []
     sources = []
+    budget = settings.rag_context_token_budget
+    seen_ids: set[str] = set()
+    seen_content: set[tuple[str, str]] = set()
+    best_similarity = search_results[0].get("similarity", 0.0) if search_results else 0.0
     for result in search_results:
+        # Skip repeats (same row, or the same title and text stored under another row) and, once
+        # there are enough sources, matches far weaker than the best one
+        result_id = str(result.get("id", ""))
+        content_heb = result.get("content_hebrew") or ""
+        fingerprint = (result.get("title_hebrew") or "", content_heb[:DEDUPE_PREFIX_CHARS])
+        if result_id in seen_ids or fingerprint in seen_content:
+            continue
+        if len(sources) >= MIN_SOURCES and result.get("similarity", 0.0) < best_similarity * LOW_SIGNAL_RATIO:
+            break
+        seen_ids.add(result_id)
+        seen_content.add(fingerprint)
+
         title_heb = result.get("title_hebrew", "")
-        content_heb = result.get("content_hebrew", "")
-        if len(content_heb) > max_content_per_source:
-            content_heb = content_heb[:max_content_per_source] + "..."
-        context_parts.append(f"## {title_heb}\n{content_heb}")
+        content_heb = _trim_at_sentence(content_heb, MAX_CONTENT_CHARS_PER_SOURCE)
+        part = f"## {title_heb}\n{content_heb}"
+        cost = _estimate_tokens(part)
+        if cost > budget:
+            if context_parts:
+                break
+            # Always keep the best match, cut down to whatever the budget allows
+            part = _trim_at_sentence(part, budget * CHARS_PER_TOKEN)
+            cost = budget
+        budget -= cost
+        context_parts.append(part)
 
         sources.append(
             SourceReference(
-                id=str(result.get("id", "")),
+                id=result_id,
                 title=result.get("title", ""),
                 title_hebrew=title_heb,
                 category=result.get("category", ""),
@@ -71,35 +180,54 @@ async def answer_question(
 
     context = "\n\n---\n\n".join(context_parts) if context_parts else ""
 
-    # 4. Get or create session for chat history
-    if session_id:
-        session = get_session(session_id)
-        if session:
-            chat_history = session.get("messages", [])
-        else:
-            # Session not found, create a new one
-            session_id = create_session(user_id=user_id, platform=platform)
-            chat_history = []
+    # 4. Use the fetched session's chat history, or the session created above (none given or not found)
+    if session:
+        chat_history = session.get("messages", [])
     else:
-        session_id = create_session(user_id=user_id, platform=platform)
+        session_id = new_session_id
         chat_history = []
 
-    # 5. Generate answer using Groq
-    answer = generate_response(
-        context=context,
-        question=question,
-        chat_history=chat_history,
-    )
+    return context, sources, session_id, chat_history
 
-    # 6. Generate suggested follow-up questions
-    suggested = generate_suggested_questions(question, answer)
 
-    # 7. Save conversation to session
-    chat_history.append({"role": "user", "content": question})
-    chat_history.append({"role": "assistant", "content": answer})
-    # Keep only the last 10 messages to avoid growing too large
-    chat_history = chat_history[-10:]
-    update_session_messages(session_id, chat_history)
+async def answer_question(
+    question: str,
+    session_id: Optional[str] = None,
+    platform: str = "web",
+    user_id: str = "anonymous",
+) -> ChatResponse:
+    """
+    Full RAG pipeline: embed question -> vector search -> build context -> generate answer.
+
+    Args:
+        question: The user's question in Hebrew or English.
+        session_id: Optional existing session ID for conversation continuity.
+        platform: Client platform identifier (default 'web').
+        user_id: User identifier (default 'anonymous').
+
+    Returns:
+        ChatResponse with answer, sources, session_id, and suggested questions.
+    """
+    # 1-4. Retrieve context and resolve the session
+    context, sources, session_id, chat_history = await _prepare_turn(question, session_id, platform, user_id)
+
+    # 5. Generate the answer and follow-up questions using Groq (one JSON-mode call)
+    try:
+        answer, suggested = await generate_response_with_suggestions(
+            context=context,
+            question=question,
+            chat_history=chat_history,
+        )
+    except Exception as e:
+        raise RagLLMError(str(e)) from e
+
+    # 6. Save the conversation, keeping only the last 10 messages to avoid growing too large
+    updated_history = [
+        *chat_history,
+        {"role": "user", "content": question},
+        {"role": "assistant", "content": answer},
+    ][-10:]
+    await _db_call(update_session_messages(session_id, updated_history))
 
     return ChatResponse(
         answer=answer,
@@ -107,3 +235,38 @@ async def answer_question(
         session_id=session_id,
         suggested_questions=suggested,
     )
+
+
+async def answer_question_stream(
+    question: str,
+    session_id: Optional[str] = None,
+    platform: str = "web",
+    user_id: str = "anonymous",
+) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+    """
+    Streaming variant of answer_question, yielding (event, data) pairs for server-sent events.
+
+    Emits one "meta" event (session ID and sources) before the LLM starts, a "token" event
+    per answer delta, and a final "done" event with the suggested follow-up questions.
+    Retrieval failures raise before anything is yielded, so callers can still map them to
+    an HTTP error.
+    """
+    context, sources, session_id, chat_history = await _prepare_turn(question, session_id, platform, user_id)
+    yield "meta", {"session_id": session_id, "sources": [s.model_dump() for s in sources]}
+
+    parts: list[str] = []
+    async for delta in generate_response_stream(context=context, question=question, chat_history=chat_history):
+        parts.append(delta)
+        yield "token", {"text": delta}
+    answer = "".join(parts)
+
+    updated_history = [
+        *chat_history,
+        {"role": "user", "content": question},
+        {"role": "assistant", "content": answer},
+    ][-10:]
+    suggested, _ = await asyncio.gather(
+        generate_suggested_questions(question, answer),
+        _db_call(update_session_messages(session_id, updated_history)),
+    )
+    yield "done", {"suggested_questions": suggested}
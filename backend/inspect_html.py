@@ -1,42 +1,56 @@
 """Inspect blog HTML structure to fix the parser."""
-from bs4 import BeautifulSoup
+import lxml.html
 
-with open("scripts/blog_cache.html", "r", encoding="utf-8") as f:
-    html = f.read()
 
-soup = BeautifulSoup(html, "lxml")
+def text_of(element) -> str:
+    """Stripped text of an element (same result as BeautifulSoup's get_text(strip=True))."""
+    return "".join(text.strip() for text in element.itertext())
+
+
+# Parse once, straight from the cached bytes
+tree = lxml.html.parse("scripts/blog_cache.html", parser=lxml.html.HTMLParser(remove_comments=True)).getroot()
+
+# Collect the report and write it in one go
+lines: list[str] = []
+
+article = tree.find(".//article")
+lines.append(f"ARTICLE: {'found' if article is not None else 'not found'}\n")
+if article is not None:
+    lines.append(f"  class: {article.get('class', '').split() or None}\n")
+
+# One walk collects the class tokens of every div, then each candidate is a set lookup
+div_classes = {cls for value in tree.xpath("//div/@class") for cls in value.split()}
+for cls in ["entry-content", "post-content", "article-content", "theiaPostSlider_pre498"]:
+    lines.append(f"div.{cls}: {'found' if cls in div_classes else 'not found'}\n")
+
+# Headers, bold text and paragraphs: one union query, bucketed by tag (document order kept)
+by_tag: dict[str, list] = {tag: [] for tag in ("h1", "h2", "h3", "strong", "p")}
+for element in tree.xpath("//h1|//h2|//h3|//strong|//p"):
+    by_tag[element.tag].append(element)
+
+for tag in ["h1", "h2", "h3"]:
+    headers = by_tag[tag]
+    lines.append(f"\n{tag}: {len(headers)} found\n")
+    for h in headers[:8]:
+        lines.append(f"  [{text_of(h)[:100]}]\n")
+
+# Show first 3 bold elements to understand structure
+strongs = by_tag["strong"]
+lines.append(f"\nstrong tags: {len(strongs)} total\n")
+for s in strongs[:10]:
+    lines.append(f"  [{text_of(s)[:80]}]\n")
+
+# Check paragraphs count
+lines.append(f"\np tags: {len(by_tag['p'])} total\n")
+
+main_tag = tree.find(".//main")
+lines.append(f"main: {'found' if main_tag is not None else 'not found'}\n")
+
+# Show body > direct children tag names
+body = tree.find("body")
+if body is not None:
+    children = [c.tag for c in body if isinstance(c.tag, str)]
+    lines.append(f"body direct children: {children[:20]}\n")
 
 with open("html_structure.txt", "w", encoding="utf-8") as out:
-    article = soup.find("article")
-    out.write(f"ARTICLE: {'found' if article else 'not found'}\n")
-    if article:
-        out.write(f"  class: {article.get('class')}\n")
-
-    for cls in ["entry-content", "post-content", "article-content", "theiaPostSlider_pre498"]:
-        elem = soup.find("div", class_=cls)
-        out.write(f"div.{cls}: {'found' if elem else 'not found'}\n")
-
-    for tag in ["h1", "h2", "h3"]:
-        headers = soup.find_all(tag)
-        out.write(f"\n{tag}: {len(headers)} found\n")
-        for h in headers[:8]:
-            out.write(f"  [{h.get_text(strip=True)[:100]}]\n")
-
-    # Show first 3 bold elements to understand structure
-    strongs = soup.find_all("strong")
-    out.write(f"\nstrong tags: {len(strongs)} total\n")
-    for s in strongs[:10]:
-        out.write(f"  [{s.get_text(strip=True)[:80]}]\n")
-
-    # Check paragraphs count
-    paras = soup.find_all("p")
-    out.write(f"\np tags: {len(paras)} total\n")
-
-    main_tag = soup.find("main")
-    out.write(f"main: {'found' if main_tag else 'not found'}\n")
-
-    # Show body > direct children tag names
-    body = soup.find("body")
-    if body:
-        children = [c.name for c in body.children if c.name]
-        out.write(f"body direct children: {children[:20]}\n")
+    out.write("".join(lines))
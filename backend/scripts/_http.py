@@ -0,0 +1,60 @@
+"""Shared HTTP client for the scraping scripts (one connection pool for the blog and the map)."""
+
+from __future__ import annotations
+
+import atexit
+import logging
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Full browser header set, sent on every request; the blog blocks bare clients
+BROWSER_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9,he;q=0.8",
+    # httpx decodes these transparently (iter_bytes yields decompressed bytes); br would need the brotli package
+    "Accept-Encoding": "gzip, deflate",
+    "Cache-Control": "no-cache",
+    "Pragma": "no-cache",
+    "Sec-Ch-Ua": '"Chromium";v="131", "Not_A Brand";v="24"',
+    "Sec-Ch-Ua-Mobile": "?0",
+    "Sec-Ch-Ua-Platform": '"Windows"',
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Sec-Fetch-User": "?1",
+    "Upgrade-Insecure-Requests": "1",
+}
+
+# Singleton client, so every fetch in a run reuses the same TCP+TLS connections
+_client: Optional[httpx.Client] = None
+
+
+def get_http_client() -> httpx.Client:
+    """Get or create the shared HTTP/2 client (closed automatically at interpreter exit)."""
+    global _client
+    if _client is None:
+        _client = httpx.Client(
+            http2=True,
+            follow_redirects=True,
+            timeout=60,
+            headers=BROWSER_HEADERS,
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+        )
+        atexit.register(close_http_client)
+        logger.info("Scraper HTTP client initialized")
+    return _client
+
+
+def close_http_client() -> None:
+    """Close the shared client's connection pool."""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
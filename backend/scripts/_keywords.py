@@ -0,0 +1,56 @@
+"""Single-pass keyword matching shared by the scrapers and the seeding pipeline."""
+
+from __future__ import annotations
+
+import re
+from typing import Iterable, Optional
+
+
+class KeywordMatcher:
+    """
+    Finds which of many literal keywords occur in a text in a single regex scan.
+
+    The alternation runs inside a lookahead, so overlapping hits are all reported; a
+    keyword that is a prefix of a longer hit at the same position is added back from
+    a precomputed map.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        ordered = sorted(set(keywords), key=len, reverse=True)
+        self._pattern = re.compile("(?=(" + "|".join(re.escape(kw) for kw in ordered) + "))")
+        self._prefixes = {kw: [other for other in ordered if other != kw and kw.startswith(other)] for kw in ordered}
+
+    def find(self, text: str) -> set[str]:
+        """Return the set of keywords that appear in `text`."""
+        found = set(self._pattern.findall(text))
+        for kw in list(found):
+            found.update(self._prefixes[kw])
+        return found
+
+    def first_positions(self, text: str) -> dict[str, int]:
+        """Return each keyword found in `text` mapped to the index of its first occurrence."""
+        positions: dict[str, int] = {}
+        for match in self._pattern.finditer(text):
+            kw = match.group(1)
+            if kw not in positions:
+                positions[kw] = match.start()
+            for prefix in self._prefixes[kw]:
+                positions.setdefault(prefix, match.start())
+        return positions
+
+
+class CategoryRules:
+    """Ordered (category, keywords) rules resolved with one scan; the earliest matching rule wins."""
+
+    def __init__(self, rules: Iterable[tuple[str, Iterable[str]]]):
+        # Keyword -> (priority, category); a keyword listed under several rules keeps the earliest
+        self._ranks: dict[str, tuple[int, str]] = {}
+        for priority, (category, keywords) in enumerate(rules):
+            for kw in keywords:
+                self._ranks.setdefault(kw, (priority, category))
+        self._matcher = KeywordMatcher(self._ranks)
+
+    def first_match(self, text: str) -> Optional[str]:
+        """Return the category of the highest-priority rule with a keyword in `text`, or None."""
+        ranked = [self._ranks[kw] for kw in self._matcher.find(text)]
+        return min(ranked)[1] if ranked else None
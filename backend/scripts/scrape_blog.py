@@ -19,36 +19,73 @@ The blog is structured with numbered H1/H2 sections:
 
 from __future__ import annotations
 
+import json
 import logging
 import os
 import re
 from dataclasses import dataclass, field
-from typing import Optional
+from functools import lru_cache
+from typing import Iterator, NamedTuple, Optional
 
 import httpx
-from bs4 import BeautifulSoup, Tag
+import lxml.html
+from lxml import etree
+
+from scripts._http import get_http_client
+from scripts._keywords import CategoryRules, KeywordMatcher
 
 logger = logging.getLogger(__name__)
 
 BLOG_URL = "https://www.ptitim.com/tokyoguide/"
+# Last successfully fetched copy of the page, used when the live fetch fails
+BLOG_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blog_cache.html")
+# ETag / Last-Modified of the cached copy, replayed as validators so an unchanged page comes back as a bodiless 304
+BLOG_CACHE_META_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blog_cache.meta.json")
+
+# Bytes handed to the parser (and cache file) per network read
+STREAM_CHUNK_SIZE = 64 * 1024
+# Cache file write buffer: the whole page (a few hundred KB) goes out in one or two syscalls
+CACHE_WRITE_BUFFER_SIZE = 1 << 20
 
 # Minimum content length to include (characters)
 MIN_CONTENT_LENGTH = 100
 
+# Runs of whitespace, collapsed to a single space by _clean_text
+_WS_RE = re.compile(r"\s+")
+
+# Parse straight into lxml's C tree (no per-node Python wrappers); comments are dropped so
+# itertext() only sees real text
+_HTML_PARSER = lxml.html.HTMLParser(remove_comments=True)
 
-@dataclass
+# Candidate content containers, most specific first (compiled once at import)
+_CONTENT_AREA_XPATHS = tuple(
+    etree.XPath(expr)
+    for expr in (
+        "//div[contains(concat(' ', normalize-space(@class), ' '), ' post__content ')]",
+        "//div[contains(concat(' ', normalize-space(@class), ' '), ' entry-content ')]",
+        "//article",
+        "//body",
+    )
+)
+
+
+@dataclass(frozen=True, slots=True)
 class ScrapedSection:
     """A parsed section from the blog."""
 
     title: str
     title_hebrew: str
     content: str
-    content_hebrew: str
     category: str
     subcategory: Optional[str] = None
     tags: list[str] = field(default_factory=list)
     location_name: Optional[str] = None
 
+    @property
+    def content_hebrew(self) -> str:
+        """Whitespace-normalized content, derived on demand (and memoized by _clean_text)."""
+        return _clean_text(self.content)
+
 
 # Known neighborhood names with their Hebrew equivalents
 NEIGHBORHOODS = {
@@ -86,85 +123,201 @@ GOLD_LIST_RESTAURANTS = [
 ]
 
 
+@lru_cache(maxsize=1024)
 def _clean_text(text: str) -> str:
     """Clean up extracted text."""
-    text = re.sub(r"\s+", " ", text)
-    text = text.strip()
-    return text
+    return _WS_RE.sub(" ", text).strip()
+
+
+# Hebrew keyword -> tag
+TAG_KEYWORDS = {
+    "ראמן": "ramen", "סושי": "sushi", "טמפורה": "tempura",
+    "אודון": "udon", "יקיטורי": "yakitori", "איזקאיה": "izakaya",
+    "קארי": "curry", "מקדש": "temple", "פארק": "park",
+    "מוזיאון": "museum", "שוק": "market", "קניות": "shopping",
+    "קפה": "cafe", "בר": "bar", "מנגה": "manga", "אנימה": "anime",
+}
+
+# Section categorization rules, checked in order (first match wins): title keywords are
+# matched case-sensitively against the title, content keywords against the lowercased
+# title + content start
+TITLE_CATEGORY_RULES = (
+    ("restaurants", ("רשימת הזהב", "המדריך לאכילה", "מסעדות", "לאכול")),
+    ("hotels", ("איפה לישון", "מלון", "לינה", "3/")),
+    ("neighborhoods", ("האיזורים", "שכונ", "4/")),
+    ("shopping", ("מה לקנות", "קניות", "8/")),
+    ("day_trips", ("קיוטו", "Kyoto", "10/")),
+    ("practical_tips", ("טיפים", "דגשים", "1/", "2/")),
+    ("attractions", ("אטרקצי", "מקדש", "מוזיאון", "פארק")),
+)
+CONTENT_CATEGORY_RULES = (
+    ("restaurants", ("ראמן", "סושי", "מסעדה", "לאכול", "אוכל", "יקיטורי")),
+    ("attractions", ("מקדש", "פארק", "מוזיאון", "תצפית", "shrine", "temple")),
+    ("hotels", ("מלון", "לישון", "ריוקאן", "hostel", "hotel")),
+)
+
+# Names paired with their lowercased form, computed once instead of inside every lookup loop
+_GOLD_LIST_LOWER = tuple((name, name.lower()) for name in GOLD_LIST_RESTAURANTS)
+_NEIGHBORHOODS_LOWER = tuple((eng, heb, eng.lower()) for eng, heb in NEIGHBORHOODS.values())
+
+# Lowercased spelling -> neighborhood key (both the key and the English name count as a mention)
+_NEIGHBORHOOD_SPELLINGS = {
+    spelling: key for key, (eng, _heb) in NEIGHBORHOODS.items() for spelling in (key, eng.lower())
+}
+
+# Matchers built once at import, one per keyword list
+_TAG_MATCHER = KeywordMatcher(TAG_KEYWORDS)
+_NEIGHBORHOOD_MATCHER = KeywordMatcher(_NEIGHBORHOOD_SPELLINGS)
+_RESTAURANT_MATCHER = KeywordMatcher(lower for _name, lower in _GOLD_LIST_LOWER)
+
+# Category rules per stage. Neighborhood names are the content stage's lowest-priority rule,
+# so one scan of the text covers that fallback too.
+_TITLE_CATEGORIES = CategoryRules(TITLE_CATEGORY_RULES)
+_CONTENT_CATEGORIES = CategoryRules((*CONTENT_CATEGORY_RULES, ("neighborhoods", _NEIGHBORHOOD_SPELLINGS)))
 
 
 def _extract_tags(content: str) -> list[str]:
     """Extract relevant tags from content."""
-    tags = []
-    tag_keywords = {
-        "ראמן": "ramen", "סושי": "sushi", "טמפורה": "tempura",
-        "אודון": "udon", "יקיטורי": "yakitori", "איזקאיה": "izakaya",
-        "קארי": "curry", "מקדש": "temple", "פארק": "park",
-        "מוזיאון": "museum", "שוק": "market", "קניות": "shopping",
-        "קפה": "cafe", "בר": "bar", "מנגה": "manga", "אנימה": "anime",
-    }
-    for hebrew, english in tag_keywords.items():
-        if hebrew in content:
-            tags.append(english)
-    return tags
+    return list(_tags_for(content))
+
+
+@lru_cache(maxsize=256)
+def _tags_for(content: str) -> tuple[str, ...]:
+    """Memoized tag scan; the same description is often tagged more than once (e.g. repeated gold-list names)."""
+    found = _TAG_MATCHER.find(content)
+    return tuple(english for hebrew, english in TAG_KEYWORDS.items() if hebrew in found)
 
 
 def _detect_neighborhood(text: str) -> Optional[tuple[str, str]]:
     """Detect if text mentions a known neighborhood."""
-    text_lower = text.lower()
-    for key, (eng, heb) in NEIGHBORHOODS.items():
-        if key in text_lower or eng.lower() in text_lower:
-            return (eng, heb)
+    found_keys = {_NEIGHBORHOOD_SPELLINGS[s] for s in _NEIGHBORHOOD_MATCHER.find(text.lower())}
+    for key, names in NEIGHBORHOODS.items():
+        if key in found_keys:
+            return names
     return None
 
 
 def _detect_restaurant(text: str) -> Optional[str]:
     """Detect if text mentions a known restaurant."""
-    text_lower = text.lower()
-    for restaurant in GOLD_LIST_RESTAURANTS:
-        if restaurant.lower() in text_lower:
+    found = _RESTAURANT_MATCHER.find(text.lower())
+    for restaurant, restaurant_lower in _GOLD_LIST_LOWER:
+        if restaurant_lower in found:
             return restaurant
     return None
 
 
-def fetch_blog_html() -> str:
-    """Fetch the blog page HTML."""
+def _element_text(element: lxml.html.HtmlElement) -> str:
+    """Concatenate an element's stripped text nodes (same result as BeautifulSoup's get_text(strip=True))."""
+    return "".join(text.strip() for text in element.itertext())
+
+
+def _h2_runs(
+    content_area: lxml.html.HtmlElement,
+) -> Iterator[tuple[lxml.html.HtmlElement, list[lxml.html.HtmlElement]]]:
+    """
+    Yield each H2 under the content area with its sibling elements up to the next H2.
+
+    Each parent's element children are listed once and the H2 positions indexed, so a
+    section's body is a list slice instead of a node-by-node sibling walk. H2s come
+    out in document order.
+    """
+    # parent -> (element children, {h2: (index, index of the next h2 or end)})
+    runs: dict[lxml.html.HtmlElement, tuple[list, dict]] = {}
+    for h2 in content_area.iter("h2"):
+        parent = h2.getparent()
+        run = runs.get(parent)
+        if run is None:
+            # Skip processing instructions and other non-element nodes
+            children = [child for child in parent if isinstance(child.tag, str)]
+            h2_idx = [i for i, child in enumerate(children) if child.tag == "h2"]
+            bounds = {children[a]: (a, b) for a, b in zip(h2_idx, h2_idx[1:] + [len(children)])}
+            runs[parent] = run = (children, bounds)
+        children, bounds = run
+        start, end = bounds[h2]
+        yield h2, children[start + 1 : end]
+
+
+def _load_cache_validators() -> dict[str, str]:
+    """Conditional-request headers for the cached page (empty when there is no usable cache)."""
+    if not os.path.exists(BLOG_CACHE_PATH):
+        return {}
+    try:
+        with open(BLOG_CACHE_META_PATH, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    headers: dict[str, str] = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def _save_cache_validators(response: httpx.Response) -> None:
+    """Store the response's ETag / Last-Modified next to the cache file (removed if it sent neither)."""
+    meta = {"etag": response.headers.get("etag"), "last_modified": response.headers.get("last-modified")}
+    if not any(meta.values()):
+        if os.path.exists(BLOG_CACHE_META_PATH):
+            os.remove(BLOG_CACHE_META_PATH)
+        return
+    with open(BLOG_CACHE_META_PATH, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def fetch_blog_document() -> lxml.html.HtmlElement:
+    """
+    Fetch the blog page and parse it while it downloads.
+
+    The request carries the cached copy's ETag / Last-Modified, so when the page hasn't
+    changed the server answers 304 and the cached file is parsed instead. Otherwise the
+    response is streamed straight into an incremental lxml parser and teed into the
+    cache file in the same loop, so the body is never buffered or decoded as one
+    string. Falls back to the cached copy when the live fetch fails.
+    """
     logger.info("Fetching blog page: %s", BLOG_URL)
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5,he;q=0.3",
-    }
+    tmp_path = BLOG_CACHE_PATH + ".part"
     try:
-        response = httpx.get(BLOG_URL, timeout=30, follow_redirects=True, headers=headers)
-        response.raise_for_status()
-        logger.info("Blog page fetched (%d bytes)", len(response.text))
-        return response.text
+        with get_http_client().stream("GET", BLOG_URL, headers=_load_cache_validators()) as response:
+            if response.status_code == 304:
+                logger.info("Blog page not modified, using cached file: %s", BLOG_CACHE_PATH)
+                return lxml.html.parse(BLOG_CACHE_PATH, parser=_HTML_PARSER).getroot()
+            response.raise_for_status()
+            parser = lxml.html.HTMLParser(remove_comments=True, encoding=response.charset_encoding)
+            with open(tmp_path, "wb", buffering=CACHE_WRITE_BUFFER_SIZE) as cache:
+                for chunk in response.iter_bytes(chunk_size=STREAM_CHUNK_SIZE):
+                    parser.feed(chunk)
+                    cache.write(chunk)
+            tree = parser.close()
+        # Only replace the cache once the whole page has arrived
+        os.replace(tmp_path, BLOG_CACHE_PATH)
+        _save_cache_validators(response)
+        logger.info("Blog page fetched and cached: %s", BLOG_CACHE_PATH)
+        return tree
     except Exception as e:
         logger.warning("Live fetch failed (%s), trying cached file...", e)
-        cache_path = os.path.join(os.path.dirname(__file__), "blog_cache.html")
-        if os.path.exists(cache_path):
-            with open(cache_path, "r", encoding="utf-8") as f:
-                return f.read()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        if os.path.exists(BLOG_CACHE_PATH):
+            return lxml.html.parse(BLOG_CACHE_PATH, parser=_HTML_PARSER).getroot()
         raise RuntimeError(f"Cannot fetch blog and no cache: {e}")
 
 
-def parse_blog(html: str) -> list[ScrapedSection]:
+def parse_blog(html: str | lxml.html.HtmlElement) -> list[ScrapedSection]:
     """
-    Parse the blog HTML into structured sections.
+    Parse the blog HTML (or an already parsed document) into structured sections.
     
     Strategy: Extract major topic sections and keep content together.
     Split only on main headers (H2) for neighborhoods and restaurants.
     """
-    soup = BeautifulSoup(html, "lxml")
-    
-    content_area = soup.find("div", class_="post__content")
-    if not content_area:
-        content_area = soup.find("div", class_="entry-content")
-    if not content_area:
-        content_area = soup.find("article")
-    if not content_area:
-        content_area = soup.body
+    tree = lxml.html.document_fromstring(html, parser=_HTML_PARSER) if isinstance(html, str) else html
+
+    content_area = None
+    for xpath in _CONTENT_AREA_XPATHS:
+        matches = xpath(tree)
+        if matches:
+            content_area = matches[0]
+            break
     
     if content_area is None:
         logger.error("Could not parse blog HTML")
@@ -172,52 +325,34 @@ def parse_blog(html: str) -> list[ScrapedSection]:
     
     sections: list[ScrapedSection] = []
     
-    # Strategy: Find H2 headers and collect all content until next H2
-    h2_elements = content_area.find_all("h2")
-    
-    for i, h2 in enumerate(h2_elements):
-        title = _clean_text(h2.get_text())
+    # Strategy: Find H2 headers and collect all content until next H2 (or end)
+    for h2, body in _h2_runs(content_area):
+        title = _clean_text(h2.text_content())
         if not title or len(title) < 3:
             continue
         
-        # Collect content between this H2 and the next H2 (or end)
-        content_parts = []
-        current = h2.next_sibling
-        
-        while current:
-            if isinstance(current, Tag):
-                # Stop at next H2
-                if current.name == "h2":
-                    break
-                # Get text content from other elements
-                text = current.get_text(strip=True)
-                if text and len(text) > 10:
-                    content_parts.append(text)
-            current = current.next_sibling
-        
-        full_content = "\n\n".join(content_parts)
+        content_parts = [text for text in map(_element_text, body) if len(text) > 10]
+        # Length the joined content will have (parts + "\n\n" separators)
+        content_len = sum(map(len, content_parts)) + 2 * len(content_parts) - 2
         
-        # Skip if content too short
-        if len(full_content) < MIN_CONTENT_LENGTH:
+        # Skip if content too short, before building the string
+        if content_len < MIN_CONTENT_LENGTH:
             continue
         
-        # Determine category based on title and content
-        category = _categorize_section(title, full_content)
+        full_content = "\n\n".join(content_parts)
         
-        # Detect location for neighborhoods
-        location = _detect_neighborhood(title)
-        location_name = location[0] if location else None
+        # Category, tags and location in one analysis pass
+        analysis = _analyze(title, full_content)
         
-        # Create section
+        # Create section (title is already cleaned above)
         sections.append(ScrapedSection(
-            title=location_name or title,
-            title_hebrew=_clean_text(title),
+            title=analysis.location_name or title,
+            title_hebrew=title,
             content=full_content,
-            content_hebrew=_clean_text(full_content),
-            category=category,
+            category=analysis.category,
             subcategory=None,
-            tags=_extract_tags(full_content),
-            location_name=location_name,
+            tags=analysis.tags,
+            location_name=analysis.location_name,
         ))
     
     # Also extract individual restaurants from restaurant sections
@@ -236,77 +371,75 @@ def parse_blog(html: str) -> list[ScrapedSection]:
     return sections
 
 
+class SectionAnalysis(NamedTuple):
+    """Keyword-derived metadata for one blog section."""
+
+    category: str
+    tags: list[str]
+    location_name: Optional[str]
+
+
+def _analyze(title: str, content: str) -> SectionAnalysis:
+    """Derive category, tags and location for a section, scanning each text once."""
+    location = _detect_neighborhood(title)
+    return SectionAnalysis(
+        category=_categorize_section(title, content),
+        tags=_extract_tags(content),
+        location_name=location[0] if location else None,
+    )
+
+
 def _categorize_section(title: str, content: str) -> str:
     """Categorize a section based on title and content."""
-    title_lower = title.lower()
-    combined = f"{title} {content[:500]}".lower()
-    
-    # Check title patterns first (most reliable)
-    if any(kw in title for kw in ["רשימת הזהב", "המדריך לאכילה", "מסעדות", "לאכול"]):
-        return "restaurants"
-    if any(kw in title for kw in ["איפה לישון", "מלון", "לינה", "3/"]):
-        return "hotels"
-    if any(kw in title for kw in ["האיזורים", "שכונ", "4/"]):
-        return "neighborhoods"
-    if any(kw in title for kw in ["מה לקנות", "קניות", "8/"]):
-        return "shopping"
-    if any(kw in title for kw in ["קיוטו", "Kyoto", "10/"]):
-        return "day_trips"
-    if any(kw in title for kw in ["טיפים", "דגשים", "1/", "2/"]):
-        return "practical_tips"
-    if any(kw in title for kw in ["אטרקצי", "מקדש", "מוזיאון", "פארק"]):
-        return "attractions"
-    
-    # Check content keywords
-    if any(kw in combined for kw in ["ראמן", "סושי", "מסעדה", "לאכול", "אוכל", "יקיטורי"]):
-        return "restaurants"
-    if any(kw in combined for kw in ["מקדש", "פארק", "מוזיאון", "תצפית", "shrine", "temple"]):
-        return "attractions"
-    if any(kw in combined for kw in ["מלון", "לישון", "ריוקאן", "hostel", "hotel"]):
-        return "hotels"
-    
-    # Check for neighborhood names
-    if _detect_neighborhood(combined):
-        return "neighborhoods"
-    
-    return "practical_tips"
+    # Only the first 500 content characters count, so they're the whole cache key
+    return _categorize_cached(title, content[:500])
+
+
+@lru_cache(maxsize=512)
+def _categorize_cached(title: str, content_prefix: str) -> str:
+    """Memoized categorization; repeated headers (e.g. the same title in several posts) are resolved once."""
+    # Check title patterns first (most reliable), then content keywords (and, last, neighborhood names)
+    return (
+        _TITLE_CATEGORIES.first_match(title)
+        or _CONTENT_CATEGORIES.first_match(f"{title} {content_prefix}".lower())
+        or "practical_tips"
+    )
 
 
 def _extract_restaurants_from_section(section: ScrapedSection) -> list[ScrapedSection]:
     """Extract individual restaurants from a restaurant section."""
     restaurants = []
     content = section.content_hebrew
+    # First occurrence of every mentioned name, from one scan of the section
+    positions = _RESTAURANT_MATCHER.first_positions(content.lower())
     
     # Look for restaurant names followed by descriptions
-    for restaurant_name in GOLD_LIST_RESTAURANTS:
-        if restaurant_name.lower() in content.lower():
-            # Find the description around this restaurant
-            idx = content.lower().find(restaurant_name.lower())
-            if idx != -1:
-                # Get context around the restaurant name (up to 500 chars after)
-                start = max(0, idx - 20)
-                end = min(len(content), idx + 500)
-                context = content[start:end]
-                
-                # Find a natural break point
-                break_points = [
-                    context.find("\n\n", len(restaurant_name)),
-                    context.find("–", len(restaurant_name) + 100),
-                ]
-                break_point = min(p for p in break_points if p > 0) if any(p > 0 for p in break_points) else 500
-                description = context[:break_point].strip()
-                
-                if len(description) >= 80:
-                    restaurants.append(ScrapedSection(
-                        title=restaurant_name,
-                        title_hebrew=restaurant_name,
-                        content=description,
-                        content_hebrew=description,
-                        category="restaurants",
-                        subcategory=section.title_hebrew,
-                        tags=_extract_tags(description),
-                        location_name=None,
-                    ))
+    for restaurant_name, name_lower in _GOLD_LIST_LOWER:
+        idx = positions.get(name_lower)
+        if idx is not None:
+            # Get context around the restaurant name (up to 500 chars after)
+            start = max(0, idx - 20)
+            end = min(len(content), idx + 500)
+            context = content[start:end]
+            
+            # Find a natural break point
+            break_points = [
+                context.find("\n\n", len(restaurant_name)),
+                context.find("–", len(restaurant_name) + 100),
+            ]
+            break_point = min(p for p in break_points if p > 0) if any(p > 0 for p in break_points) else 500
+            description = context[:break_point].strip()
+            
+            if len(description) >= 80:
+                restaurants.append(ScrapedSection(
+                    title=restaurant_name,
+                    title_hebrew=restaurant_name,
+                    content=description,
+                    category="restaurants",
+                    subcategory=section.title_hebrew,
+                    tags=_extract_tags(description),
+                    location_name=None,
+                ))
     
     return restaurants
 
@@ -315,39 +448,36 @@ def _extract_neighborhoods_from_section(section: ScrapedSection) -> list[Scraped
     """Extract individual neighborhoods from a neighborhood section."""
     neighborhoods = []
     content = section.content_hebrew
+    # First occurrence of every mentioned spelling, from one scan of the section
+    positions = _NEIGHBORHOOD_MATCHER.first_positions(content.lower())
     
-    for key, (eng, heb) in NEIGHBORHOODS.items():
+    for eng, heb, eng_lower in _NEIGHBORHOODS_LOWER:
+        idx = positions.get(eng_lower)
         # Check if this neighborhood is mentioned
-        if eng.lower() in content.lower():
-            idx = content.lower().find(eng.lower())
-            if idx != -1:
-                # Get context around the neighborhood
-                start = max(0, idx)
-                end = min(len(content), idx + 600)
-                context = content[start:end]
-                
-                # Clean up
-                description = context.strip()
-                
-                if len(description) >= 100:
-                    neighborhoods.append(ScrapedSection(
-                        title=eng,
-                        title_hebrew=heb,
-                        content=description,
-                        content_hebrew=description,
-                        category="neighborhoods",
-                        subcategory=None,
-                        tags=_extract_tags(description),
-                        location_name=eng,
-                    ))
+        if idx is not None:
+            # Get context around the neighborhood
+            context = content[idx : idx + 600]
+            
+            # Clean up
+            description = context.strip()
+            
+            if len(description) >= 100:
+                neighborhoods.append(ScrapedSection(
+                    title=eng,
+                    title_hebrew=heb,
+                    content=description,
+                    category="neighborhoods",
+                    subcategory=None,
+                    tags=_extract_tags(description),
+                    location_name=eng,
+                ))
     
     return neighborhoods
 
 
 def scrape_blog() -> list[ScrapedSection]:
     """Main entry point: fetch and parse the blog."""
-    html = fetch_blog_html()
-    return parse_blog(html)
+    return parse_blog(fetch_blog_document())
 
 
 if __name__ == "__main__":
@@ -9,19 +9,25 @@ Map ID: 1I0o12hoecmBorcEsinQqw4nhTDG7adU
 
 from __future__ import annotations
 
+import html
+import io
 import logging
 import re
 from dataclasses import dataclass, field
 from typing import Optional
 
-import httpx
-from bs4 import BeautifulSoup
+from lxml import etree
+
+from scripts._http import get_http_client
 
 logger = logging.getLogger(__name__)
 
 # KML export URL for the Google My Maps
 KML_URL = "https://www.google.com/maps/d/kml?mid=1I0o12hoecmBorcEsinQqw4nhTDG7adU&forcekml=1"
 
+# Any HTML tag (or comment) inside a placemark description
+_HTML_TAG_RE = re.compile(r"<[^>]*>")
+
 
 @dataclass
 class MapPlace:
@@ -35,56 +41,86 @@ class MapPlace:
     tags: list[str] = field(default_factory=list)
 
 
-def fetch_kml() -> str:
-    """Fetch the KML data from Google My Maps."""
+def fetch_kml() -> bytes:
+    """Fetch the KML data from Google My Maps (raw bytes, so the XML parser handles the encoding)."""
     logger.info("Fetching KML from: %s", KML_URL)
     try:
-        response = httpx.get(KML_URL, timeout=30, follow_redirects=True)
+        response = get_http_client().get(KML_URL, timeout=30)
         response.raise_for_status()
-        logger.info("KML fetched (%d bytes)", len(response.text))
-        return response.text
+        logger.info("KML fetched (%d bytes)", len(response.content))
+        return response.content
     except Exception as e:
         logger.warning("Could not fetch KML data: %s", e)
+        return b""
+
+
+def _element_text(element: Optional[etree._Element]) -> str:
+    """Stripped text of an element ('' when missing), like BeautifulSoup's get_text(strip=True)."""
+    if element is None:
         return ""
+    return "".join(text.strip() for text in element.itertext())
+
+
+def _strip_html(raw: str) -> str:
+    """
+    Text content of an HTML description snippet (tags dropped, entities decoded).
+
+    Descriptions are short, flat snippets, so splitting on tags beats building a parse
+    tree per placemark. Each text run between tags is stripped, like get_text(strip=True).
+    """
+    if "<" not in raw and "&" not in raw:
+        return raw
+    return "".join(html.unescape(part).strip() for part in _HTML_TAG_RE.split(raw))
+
+
+def _release(placemark: etree._Element) -> None:
+    """
+    Free a parsed placemark's subtree and detach the already-processed placemarks before it.
 
+    Only preceding Placemark siblings are removed: the Folder's own name element comes
+    first and is still needed for the layer name of the placemarks that follow.
+    """
+    placemark.clear()
+    parent = placemark.getparent()
+    while (previous := placemark.getprevious()) is not None and previous.tag == placemark.tag:
+        parent.remove(previous)
 
-def parse_kml(kml_content: str) -> list[MapPlace]:
-    """Parse KML XML and extract places with coordinates."""
+
+def parse_kml(kml_content: bytes | str) -> list[MapPlace]:
+    """
+    Parse KML XML and extract places with coordinates.
+
+    Placemarks are stream-parsed one at a time, then cleared and detached once read,
+    so the full document tree is never held in memory. Only placemarks inside a Folder (a map
+    layer) are kept. Content that isn't well-formed XML yields no places.
+    """
     if not kml_content:
         return []
+    if isinstance(kml_content, str):
+        kml_content = kml_content.encode("utf-8")
 
-    soup = BeautifulSoup(kml_content, "lxml-xml")
     places: list[MapPlace] = []
 
-    # Find all Folder elements (layers in Google My Maps)
-    folders = soup.find_all("Folder")
-
-    for folder in folders:
-        folder_name_elem = folder.find("name", recursive=False)
-        layer_name = folder_name_elem.get_text(strip=True) if folder_name_elem else ""
-
-        # Find all Placemark elements within this folder
-        placemarks = folder.find_all("Placemark")
+    try:
+        # Any namespace: Google exports KML 2.2, but older files use other KML namespaces
+        for _event, placemark in etree.iterparse(io.BytesIO(kml_content), events=("end",), tag="{*}Placemark"):
+            # The enclosing Folder element is the layer in Google My Maps
+            folder = next(placemark.iterancestors("{*}Folder"), None)
+            if folder is None:
+                _release(placemark)
+                continue
+            layer_name = _element_text(folder.find("{*}name"))
 
-        for placemark in placemarks:
-            name_elem = placemark.find("name")
-            name = name_elem.get_text(strip=True) if name_elem else ""
+            name = _element_text(placemark.find(".//{*}name"))
 
             # Get description (may contain HTML)
-            desc_elem = placemark.find("description")
-            description = ""
-            if desc_elem:
-                raw_desc = desc_elem.get_text(strip=True)
-                # Clean HTML entities
-                desc_soup = BeautifulSoup(raw_desc, "html.parser")
-                description = desc_soup.get_text(strip=True)
+            description = _strip_html(_element_text(placemark.find(".//{*}description")))
 
             # Get coordinates
-            coord_elem = placemark.find("coordinates")
+            coord_text = _element_text(placemark.find(".//{*}coordinates"))
             lat: Optional[float] = None
             lng: Optional[float] = None
-            if coord_elem:
-                coord_text = coord_elem.get_text(strip=True)
+            if coord_text:
                 # KML format: longitude,latitude,altitude
                 parts = coord_text.split(",")
                 if len(parts) >= 2:
@@ -94,6 +130,9 @@ def parse_kml(kml_content: str) -> list[MapPlace]:
                     except ValueError:
                         pass
 
+            # Done with this placemark: free its subtree
+            _release(placemark)
+
             if name:
                 places.append(
                     MapPlace(
@@ -104,29 +143,16 @@ def parse_kml(kml_content: str) -> list[MapPlace]:
                         layer_name=layer_name,
                     )
                 )
+    except etree.XMLSyntaxError as e:
+        # e.g. Google's HTML sign-in page when the map isn't public; a truncated document
+        # is dropped too, so a partial list can't get the missing places pruned
+        logger.warning("KML is not valid XML (%s); skipping map places", e)
+        return []
 
     logger.info("Parsed %d places from KML", len(places))
     return places
 
 
-def _categorize_layer(layer_name: str) -> str:
-    """Map KML layer name to a content category."""
-    layer_lower = layer_name.lower()
-    if any(kw in layer_lower for kw in ["food", "restaurant", "eat", "אוכל", "מסעד"]):
-        return "restaurants"
-    if any(kw in layer_lower for kw in ["shop", "buy", "קניות"]):
-        return "shopping"
-    if any(kw in layer_lower for kw in ["hotel", "sleep", "מלון", "לינה"]):
-        return "hotels"
-    if any(kw in layer_lower for kw in ["cafe", "coffee", "קפה"]):
-        return "restaurants"
-    if any(kw in layer_lower for kw in ["bar", "drink", "בר"]):
-        return "restaurants"
-    if any(kw in layer_lower for kw in ["sight", "attraction", "temple", "אטרקצ"]):
-        return "attractions"
-    return "attractions"
-
-
 def scrape_map() -> list[MapPlace]:
     """Main entry point: fetch and parse the Google My Maps KML."""
     kml = fetch_kml()
@@ -2,20 +2,28 @@
 Seed the Supabase database with content from the blog and map.
 
 Usage:
-    poetry run python -m scripts.seed_database
+    poetry run python -m scripts.seed_database [--force]
 
 This script:
 1. Scrapes the Ptitim Tokyo Guide blog
 2. Optionally scrapes the Google My Maps KML
-3. Generates embeddings for all content
-4. Inserts everything into the Supabase tokyo_content table
+3. Generates embeddings for new or changed content
+4. Inserts it into the Supabase tokyo_content table and prunes rows that no longer exist
+
+Rows are keyed by a hash of their content and the embedding model, so re-seeding unchanged
+content is a no-op, while switching models re-embeds everything and prunes the old rows.
+Pass --force to empty the table and re-insert everything.
 """
 
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import AbstractSet, Any, Optional
 
 # Add the backend directory to the path so we can import app modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -24,18 +32,141 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from app.services.database import get_supabase_client
-from app.services.embeddings import encode_batch, load_model
+from postgrest.types import ReturnMethod
+from supabase import Client
+
+from app.services.database import format_vector, get_supabase_client
+from app.services.embeddings import _cache_model_id, encode_batch, load_model
+from scripts._keywords import CategoryRules
 from scripts.scrape_blog import ScrapedSection, scrape_blog
 from scripts.scrape_map import MapPlace, scrape_map
 
 logger = logging.getLogger(__name__)
 
+# Map place categorization, checked in order: layer-name rules first, then content keywords
+_MAP_LAYER_CATEGORIES = CategoryRules(
+    (
+        ("restaurants", ("food", "eat", "restaurant", "ramen", "sushi", "אוכל", "מסעד")),
+        ("restaurants", ("cafe", "coffee", "קפה")),
+        ("restaurants", ("bar", "drink", "בר", "שתיה")),
+        ("shopping", ("shop", "buy", "store", "קניות", "חנות")),
+        ("hotels", ("hotel", "sleep", "hostel", "מלון", "לינה")),
+        ("attractions", ("temple", "shrine", "park", "museum", "מקדש", "פארק")),
+    )
+)
+_MAP_CONTENT_CATEGORIES = CategoryRules(
+    (
+        ("restaurants", ("ramen", "sushi", "restaurant", "izakaya", "ראמן", "סושי")),
+        ("attractions", ("temple", "shrine", "park", "museum")),
+    )
+)
+
+
+# Texts per embedding batch. encode_batch groups texts by length before batching, so padding
+# stays small and larger batches just mean fewer forward passes / API round-trips.
+EMBED_BATCH_SIZE = 64
+
+# Rows per embed+insert chunk: each chunk's insert goes out while the next one is being embedded
+INSERT_BATCH_SIZE = 128
+INSERT_CONCURRENCY = 5
 
-def seed_blog_content(sections: list[ScrapedSection]) -> int:
+# Rows per content_hash lookup page / per stale-row delete (hashes are 64-char hex in the URL)
+HASH_PAGE_SIZE = 1000
+HASH_DELETE_CHUNK = 100
+
+
+def _content_hash(row: dict[str, Any], model_id: str) -> str:
+    """
+    Key for a tokyo_content row: sha256 of its fields (embedding excluded) and the embedding model.
+
+    Equal content under the same model means equal key; a model change gives every row a new
+    key, so it is re-embedded and the rows embedded by the old model are pruned.
+    """
+    payload = {**row, "embedding_model": model_id}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _embed_and_insert(
+    client: Client,
+    rows: list[dict[str, Any]],
+    texts: list[str],
+    label: str,
+    stored_hashes: AbstractSet[str],
+    seen_hashes: set[str],
+) -> int:
+    """
+    Embed `texts` and insert the matching rows into tokyo_content, chunk by chunk.
+
+    Each row gets a content_hash (which covers the loaded embedding model), recorded in
+    `seen_hashes`. Rows whose hash is in `stored_hashes` (already in the table) or was
+    already seen in this run are skipped before embedding. Encoding is compute-bound and inserting is round-trip
+    bound, so each chunk's insert is handed to a small thread pool as soon as its
+    embeddings are ready and runs while the next chunk is encoded. Rows aren't echoed
+    back (return=minimal). A failing insert is logged and skipped without aborting
+    the others. Returns the number of rows inserted.
+    """
+    model_id = _cache_model_id()
+    new_rows, new_texts = [], []
+    for row, text in zip(rows, texts):
+        row["content_hash"] = row_hash = _content_hash(row, model_id)
+        if row_hash in stored_hashes or row_hash in seen_hashes:
+            seen_hashes.add(row_hash)
+            continue
+        seen_hashes.add(row_hash)
+        new_rows.append(row)
+        new_texts.append(text)
+    if len(new_rows) < len(rows):
+        logger.info("Skipping %d unchanged %s rows", len(rows) - len(new_rows), label)
+
+    def insert_one(start: int, batch: list[dict[str, Any]]) -> int:
+        try:
+            # A row stored concurrently by another run is left as is instead of failing the batch
+            client.table("tokyo_content").upsert(
+                batch, on_conflict="content_hash", ignore_duplicates=True, returning=ReturnMethod.minimal
+            ).execute()
+        except Exception as e:
+            logger.error("Failed to insert %s %d-%d: %s", label, start, start + len(batch), e)
+            return 0
+        # Each batch is one INSERT statement, so success means every row landed
+        logger.info("Inserted %s %d-%d (%d items)", label, start, start + len(batch), len(batch))
+        return len(batch)
+
+    with ThreadPoolExecutor(max_workers=INSERT_CONCURRENCY, thread_name_prefix="insert") as pool:
+        pending = []
+        for start in range(0, len(new_rows), INSERT_BATCH_SIZE):
+            end = start + INSERT_BATCH_SIZE
+            batch = new_rows[start:end]
+            embeddings = encode_batch(new_texts[start:end], batch_size=EMBED_BATCH_SIZE)
+            for row, embedding in zip(batch, embeddings):
+                row["embedding"] = format_vector(embedding)
+            pending.append(pool.submit(insert_one, start, batch))
+        return sum(future.result() for future in pending)
+
+
+def _blog_row(section: ScrapedSection) -> dict[str, Any]:
+    """tokyo_content row for a blog section."""
+    return {
+        "title": section.title,
+        "title_hebrew": section.title_hebrew,
+        "content": section.content,
+        "content_hebrew": section.content_hebrew,
+        "category": section.category,
+        "subcategory": section.subcategory,
+        "tags": section.tags,
+        "location_name": section.location_name,
+    }
+
+
+def seed_blog_content(
+    sections: list[ScrapedSection],
+    stored_hashes: AbstractSet[str] = frozenset(),
+    seen_hashes: Optional[set[str]] = None,
+) -> int:
     """
     Generate embeddings and insert blog sections into Supabase.
 
+    Sections already stored (content hash in `stored_hashes`) are skipped; every
+    section's hash is added to `seen_hashes` when given.
     Returns the number of items inserted.
     """
     if not sections:
@@ -47,38 +178,9 @@ def seed_blog_content(sections: list[ScrapedSection]) -> int:
     # Generate embeddings for all sections (using Hebrew content for better Hebrew search)
     logger.info("Generating embeddings for %d sections...", len(sections))
     texts = [f"{s.title_hebrew} {s.content_hebrew}" for s in sections]
-    embeddings = encode_batch(texts, batch_size=16)
-
-    # Prepare rows for insertion
-    rows = []
-    for section, embedding in zip(sections, embeddings):
-        rows.append(
-            {
-                "title": section.title,
-                "title_hebrew": section.title_hebrew,
-                "content": section.content,
-                "content_hebrew": section.content_hebrew,
-                "category": section.category,
-                "subcategory": section.subcategory,
-                "tags": section.tags,
-                "location_name": section.location_name,
-                "embedding": embedding,
-            }
-        )
-
-    # Insert in batches of 50
-    inserted = 0
-    batch_size = 50
-    for i in range(0, len(rows), batch_size):
-        batch = rows[i : i + batch_size]
-        try:
-            result = client.table("tokyo_content").insert(batch).execute()
-            inserted += len(result.data)
-            logger.info("Inserted batch %d-%d (%d items)", i, i + len(batch), len(result.data))
-        except Exception as e:
-            logger.error("Failed to insert batch %d-%d: %s", i, i + len(batch), e)
-
-    return inserted
+    rows = [_blog_row(s) for s in sections]
+    seen = seen_hashes if seen_hashes is not None else set()
+    return _embed_and_insert(client, rows, texts, "batch", stored_hashes, seen)
 
 
 def _categorize_map_place(place: MapPlace) -> str:
@@ -86,35 +188,40 @@ def _categorize_map_place(place: MapPlace) -> str:
     layer = place.layer_name.lower() if place.layer_name else ""
     name = place.name.lower() if place.name else ""
     desc = place.description.lower() if place.description else ""
-    combined = f"{layer} {name} {desc}"
-    
-    # Check layer name patterns
-    if any(kw in layer for kw in ["food", "eat", "restaurant", "ramen", "sushi", "אוכל", "מסעד"]):
-        return "restaurants"
-    if any(kw in layer for kw in ["cafe", "coffee", "קפה"]):
-        return "restaurants"
-    if any(kw in layer for kw in ["bar", "drink", "בר", "שתיה"]):
-        return "restaurants"
-    if any(kw in layer for kw in ["shop", "buy", "store", "קניות", "חנות"]):
-        return "shopping"
-    if any(kw in layer for kw in ["hotel", "sleep", "hostel", "מלון", "לינה"]):
-        return "hotels"
-    if any(kw in layer for kw in ["temple", "shrine", "park", "museum", "מקדש", "פארק"]):
-        return "attractions"
-    
-    # Check content keywords if layer didn't match
-    if any(kw in combined for kw in ["ramen", "sushi", "restaurant", "izakaya", "ראמן", "סושי"]):
-        return "restaurants"
-    if any(kw in combined for kw in ["temple", "shrine", "park", "museum"]):
-        return "attractions"
-    
-    return "attractions"  # Default fallback
-
-
-def seed_map_places(places: list[MapPlace]) -> int:
+
+    # Check layer name patterns, then content keywords if the layer didn't match
+    return (
+        _MAP_LAYER_CATEGORIES.first_match(layer)
+        or _MAP_CONTENT_CATEGORIES.first_match(f"{layer} {name} {desc}")
+        or "attractions"  # Default fallback
+    )
+
+
+def _map_row(place: MapPlace) -> dict[str, Any]:
+    """tokyo_content row for a map place."""
+    return {
+        "title": place.name,
+        "title_hebrew": place.name,  # Map names may be in English
+        "content": place.description or place.name,
+        "content_hebrew": place.description or place.name,
+        "category": _categorize_map_place(place),  # Use proper categorization
+        "tags": place.tags or [],
+        "location_name": place.name,
+        "latitude": place.latitude,
+        "longitude": place.longitude,
+    }
+
+
+def seed_map_places(
+    places: list[MapPlace],
+    stored_hashes: AbstractSet[str] = frozenset(),
+    seen_hashes: Optional[set[str]] = None,
+) -> int:
     """
     Generate embeddings and insert map places that don't already exist in the database.
 
+    Places already stored (content hash in `stored_hashes`) are skipped; every
+    place's hash is added to `seen_hashes` when given.
     Returns the number of items inserted.
     """
     if not places:
@@ -128,50 +235,29 @@ def seed_map_places(places: list[MapPlace]) -> int:
     if not meaningful:
         # Fallback: allow places with just names if descriptions are empty
         meaningful = [p for p in places if p.name and len(p.name) > 3]
-    
+
     if not meaningful:
         logger.warning("No meaningful map places found")
         return 0
 
     logger.info("Generating embeddings for %d map places...", len(meaningful))
-    texts = [f"{p.name} {p.description}" for p in meaningful]
-    embeddings = encode_batch(texts, batch_size=16)
-
-    rows = []
-    for place, embedding in zip(meaningful, embeddings):
-        category = _categorize_map_place(place)
-        rows.append(
-            {
-                "title": place.name,
-                "title_hebrew": place.name,  # Map names may be in English
-                "content": place.description or place.name,
-                "content_hebrew": place.description or place.name,
-                "category": category,  # Use proper categorization
-                "tags": place.tags or [],
-                "location_name": place.name,
-                "latitude": place.latitude,
-                "longitude": place.longitude,
-                "embedding": embedding,
-            }
-        )
-
-    inserted = 0
-    batch_size = 50
-    for i in range(0, len(rows), batch_size):
-        batch = rows[i : i + batch_size]
-        try:
-            result = client.table("tokyo_content").insert(batch).execute()
-            inserted += len(result.data)
-            logger.info("Inserted map batch %d-%d (%d items)", i, i + len(batch), len(result.data))
-        except Exception as e:
-            logger.error("Failed to insert map batch %d-%d: %s", i, i + len(batch), e)
-
-    return inserted
+    # Name-only places embed just the name, so repeated names share one embedding in encode_batch
+    texts = [f"{p.name} {p.description}" if p.description else p.name for p in meaningful]
+    rows = [_map_row(p) for p in meaningful]
+    seen = seen_hashes if seen_hashes is not None else set()
+    return _embed_and_insert(client, rows, texts, "map batch", stored_hashes, seen)
 
 
 def clear_existing_content() -> None:
     """Delete all existing content from the tokyo_content table."""
     client = get_supabase_client()
+    try:
+        # TRUNCATE via RPC: one cheap statement instead of a row-by-row DELETE
+        client.rpc("truncate_tokyo_content").execute()
+        logger.info("Cleared existing content from tokyo_content table")
+        return
+    except Exception as e:
+        logger.warning("truncate_tokyo_content RPC failed (%s), deleting rows instead", e)
     try:
         # Delete all rows (Supabase requires a filter, so we use gt with a very old date)
         client.table("tokyo_content").delete().gte("created_at", "2000-01-01").execute()
@@ -180,8 +266,57 @@ def clear_existing_content() -> None:
         logger.error("Failed to clear existing content: %s", e)
 
 
-def main() -> None:
-    """Main seeding pipeline."""
+def get_stored_content_hashes() -> set[str]:
+    """content_hash of every row already in tokyo_content (empty on error, so everything is re-inserted)."""
+    client = get_supabase_client()
+    hashes: set[str] = set()
+    try:
+        # PostgREST caps rows per response, so page through the table. Keyset paging on the
+        # (unique) content_hash: unordered offset pages could skip or repeat rows.
+        last_hash: Optional[str] = None
+        while True:
+            query = (
+                client.table("tokyo_content")
+                .select("content_hash")
+                .not_.is_("content_hash", "null")
+                .order("content_hash")
+                .limit(HASH_PAGE_SIZE)
+            )
+            if last_hash is not None:
+                query = query.gt("content_hash", last_hash)
+            page = query.execute().data or []
+            hashes.update(row["content_hash"] for row in page)
+            if len(page) < HASH_PAGE_SIZE:
+                break
+            last_hash = page[-1]["content_hash"]
+    except Exception as e:
+        logger.warning("Could not read stored content hashes (%s); re-inserting everything", e)
+        return set()
+    logger.info("Found %d stored rows", len(hashes))
+    return hashes
+
+
+def prune_stale_content(stale_hashes: set[str]) -> None:
+    """Delete rows whose content is no longer produced by the scrapers (and legacy rows without a hash)."""
+    client = get_supabase_client()
+    stale = sorted(stale_hashes)
+    try:
+        for i in range(0, len(stale), HASH_DELETE_CHUNK):
+            client.table("tokyo_content").delete().in_("content_hash", stale[i : i + HASH_DELETE_CHUNK]).execute()
+        client.table("tokyo_content").delete().is_("content_hash", "null").execute()
+        logger.info("Pruned %d stale rows", len(stale))
+    except Exception as e:
+        logger.error("Failed to prune stale content: %s", e)
+
+
+def main(blog_sections: Optional[list[ScrapedSection]] = None, force: bool = False) -> None:
+    """
+    Main seeding pipeline (pass `blog_sections` to skip scraping the blog again).
+
+    By default only new or changed rows are embedded and inserted, and rows that are
+    no longer produced are pruned afterwards. `force` empties the table first and
+    re-inserts everything.
+    """
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -191,38 +326,58 @@ def main() -> None:
     logger.info("Tokyo Guide Database Seeding")
     logger.info("=" * 60)
 
-    # Load the embedding model
-    logger.info("Step 1: Loading embedding model...")
-    load_model()
-
-    # Clear existing data
-    logger.info("Step 2: Clearing existing content...")
-    clear_existing_content()
-
-    # Scrape blog
-    logger.info("Step 3: Scraping blog content...")
-    blog_sections = scrape_blog()
-    logger.info("Found %d blog sections", len(blog_sections))
-
-    # Seed blog content
-    logger.info("Step 4: Seeding blog content...")
-    blog_count = seed_blog_content(blog_sections)
-    logger.info("Inserted %d blog items", blog_count)
-
-    # Scrape map (optional, may fail if KML is not accessible)
-    logger.info("Step 5: Scraping map data...")
-    try:
-        map_places = scrape_map()
-        logger.info("Found %d map places", len(map_places))
+    # The scrapes and the table clear/hash lookup are network-bound: start them now so they
+    # overlap with the model load (and the map scrape with blog seeding)
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix="prep") as pool:
+        blog_future = pool.submit(scrape_blog) if blog_sections is None else None
+        map_future = pool.submit(scrape_map)
+        step = "Clearing existing content" if force else "Reading stored content hashes"
+        logger.info("Step 1: %s (in the background)...", step)
+        stored_future = pool.submit(clear_existing_content if force else get_stored_content_hashes)
+
+        # Load the embedding model
+        logger.info("Step 2: Loading embedding model...")
+        load_model()
+
+        # Nothing may be inserted until the old rows are gone (force) or known
+        stored_hashes: set[str] = stored_future.result() or set()
+        seen_hashes: set[str] = set()
+
+        # Scrape blog
+        logger.info("Step 3: Scraping blog content...")
+        if blog_future is not None:
+            blog_sections = blog_future.result()
+        logger.info("Found %d blog sections", len(blog_sections))
+
+        # Seed blog content
+        logger.info("Step 4: Seeding blog content...")
+        blog_count = seed_blog_content(blog_sections, stored_hashes, seen_hashes)
+        logger.info("Inserted %d blog items", blog_count)
+
+        # Scrape map (optional, may fail if KML is not accessible)
+        logger.info("Step 5: Scraping map data...")
+        map_scraped = False
+        try:
+            map_places = map_future.result()
+            logger.info("Found %d map places", len(map_places))
+
+            if map_places:
+                map_scraped = True
+                logger.info("Step 6: Seeding map places...")
+                map_count = seed_map_places(map_places, stored_hashes, seen_hashes)
+                logger.info("Inserted %d map items", map_count)
+            else:
+                logger.info("No map places to seed (KML may not be accessible)")
+        except Exception as e:
+            logger.warning("Map scraping failed (non-critical): %s", e)
 
-        if map_places:
-            logger.info("Step 6: Seeding map places...")
-            map_count = seed_map_places(map_places)
-            logger.info("Inserted %d map items", map_count)
+    # Only prune when both sources came through, so a failed map fetch doesn't wipe the map rows
+    if not force:
+        if blog_sections and map_scraped:
+            logger.info("Step 7: Pruning stale content...")
+            prune_stale_content(stored_hashes - seen_hashes)
         else:
-            logger.info("No map places to seed (KML may not be accessible)")
-    except Exception as e:
-        logger.warning("Map scraping failed (non-critical): %s", e)
+            logger.info("Skipping stale-content pruning (a source returned nothing)")
 
     logger.info("=" * 60)
     logger.info("Seeding complete! Total blog items: %d", blog_count)
@@ -230,4 +385,4 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
+    main(force="--force" in sys.argv[1:])
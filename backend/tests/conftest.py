@@ -0,0 +1,39 @@
+"""Shared test fixtures."""
+
+from __future__ import annotations
+
+from typing import AsyncIterator, Iterator
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session")
+def client() -> Iterator[TestClient]:
+    """
+    One test client for the whole session, with mocked dependencies.
+
+    The client is not entered as a context manager, so the app lifespan (model load and
+    embedding warm-up) never runs; tests patch the services they exercise.
+    """
+    # Mock the embedding model loading to avoid downloading the model in tests. app.main binds
+    # the mock at import, so the patch can end there instead of leaking into the loader tests.
+    with patch("app.services.embeddings.load_model"):
+        from app.main import app
+
+    yield TestClient(app)
+
+
+@pytest.fixture
+async def aclient(client: TestClient) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Async client that calls the app in-process over ASGITransport.
+
+    Requests run on the test's own event loop instead of going through TestClient's
+    sync-to-async portal, which is all the trivial routes need.
+    """
+    transport = httpx.ASGITransport(app=client.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as ac:
+        yield ac
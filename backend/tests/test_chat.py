@@ -4,20 +4,10 @@ from __future__ import annotations
 
 from unittest.mock import AsyncMock, patch
 
-import pytest
+import httpx
 from fastapi.testclient import TestClient
 
 
-@pytest.fixture
-def client():
-    """Create a test client with mocked dependencies."""
-    # Mock the embedding model loading to avoid downloading the model in tests
-    with patch("app.services.embeddings.load_model"):
-        from app.main import app
-
-        return TestClient(app)
-
-
 class TestChatEndpoint:
     """Tests for POST /api/chat."""
 
@@ -57,22 +47,99 @@ class TestChatEndpoint:
         assert response.status_code == 200 or response.status_code == 500
         # Note: 500 may occur if Supabase/Groq are not configured in tests
 
+    @patch("app.routers.chat.answer_question")
+    def test_chat_maps_pipeline_errors(self, mock_answer, client: TestClient):
+        """Typed RAG pipeline errors should map to their HTTP status codes."""
+        from app.services.rag import RagEmbedError, RagTimeout
+
+        mock_answer.side_effect = RagEmbedError("HF API failed")
+        assert client.post("/api/chat", json={"question": "שאלה?"}).status_code == 503
+
+        mock_answer.side_effect = RagTimeout("read timeout")
+        assert client.post("/api/chat", json={"question": "שאלה?"}).status_code == 504
+
+    @patch("app.services.rag.create_session", new_callable=AsyncMock, return_value="s1")
+    @patch("app.services.rag.vector_search", new_callable=AsyncMock, side_effect=httpx.ReadTimeout("read timeout"))
+    @patch("app.services.rag.encode_text_async", new_callable=AsyncMock, return_value=[0.0] * 384)
+    def test_chat_maps_search_timeout_to_504(self, mock_encode, mock_search, mock_create, client: TestClient):
+        """A PostgREST timeout during retrieval should come back as a 504, not a generic 500."""
+        response = client.post("/api/chat", json={"question": "שאלה?"})
+        assert response.status_code == 504
+        mock_search.assert_awaited_once()
+
+    @patch("app.services.rag.encode_text_async", new_callable=AsyncMock)
+    def test_chat_maps_hf_timeout_to_504(self, mock_encode, client: TestClient):
+        """An HF API timeout, surfaced as the retry loop's chained RuntimeError, should be a 504."""
+        error = RuntimeError("HF API failed after 3 attempts: timed out")
+        error.__cause__ = httpx.ConnectTimeout("timed out")
+        mock_encode.side_effect = error
+        assert client.post("/api/chat", json={"question": "שאלה?"}).status_code == 504
+
+    @patch("app.routers.chat.answer_question_stream")
+    def test_chat_stream_sends_events(self, mock_stream, client: TestClient):
+        """Streaming endpoint should forward pipeline events as server-sent events."""
+
+        async def events(**kwargs):
+            yield "meta", {"session_id": "s1", "sources": []}
+            yield "token", {"text": "שלום"}
+            yield "done", {"suggested_questions": ["שאלה?"]}
+
+        mock_stream.side_effect = events
+        response = client.post("/api/chat/stream", json={"question": "שאלה?"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = response.text
+        assert body.index("event: meta") < body.index("event: token") < body.index("event: done")
+        assert "שלום" in body
+
+    @patch("app.routers.chat.answer_question_stream")
+    def test_chat_stream_maps_retrieval_errors(self, mock_stream, client: TestClient):
+        """Failures before the first event should still map to HTTP status codes."""
+        from app.services.rag import RagEmbedError
+
+        async def events(**kwargs):
+            raise RagEmbedError("HF API failed")
+            yield  # pragma: no cover
+
+        mock_stream.side_effect = events
+        assert client.post("/api/chat/stream", json={"question": "שאלה?"}).status_code == 503
+
 
 class TestHealthEndpoint:
     """Tests for GET /health."""
 
-    def test_health_check(self, client: TestClient):
+    async def test_health_check(self, aclient: httpx.AsyncClient):
         """Health endpoint should return ok status."""
-        response = client.get("/health")
+        response = await aclient.get("/health")
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "ok"
         assert "version" in data
 
-    def test_root_endpoint(self, client: TestClient):
+    async def test_root_endpoint(self, aclient: httpx.AsyncClient):
         """Root endpoint should return basic info."""
-        response = client.get("/")
+        response = await aclient.get("/")
         assert response.status_code == 200
         data = response.json()
         assert "name" in data
         assert "version" in data
+
+
+class TestCORS:
+    """Tests for the ASGI CORS middleware."""
+
+    def test_preflight_short_circuits(self, client: TestClient):
+        """Preflight requests should get a 204 with CORS headers."""
+        response = client.options(
+            "/api/chat",
+            headers={"Origin": "https://example.com", "Access-Control-Request-Method": "POST"},
+        )
+        assert response.status_code == 204
+        assert response.headers["access-control-allow-origin"] == "*"
+        assert response.headers["access-control-allow-methods"] == "*"
+
+    def test_simple_request_gets_allow_origin(self, client: TestClient):
+        """Regular responses should carry the allow-origin header."""
+        response = client.get("/health", headers={"Origin": "https://example.com"})
+        assert response.status_code == 200
+        assert response.headers["access-control-allow-origin"] == "*"
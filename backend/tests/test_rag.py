@@ -2,7 +2,8 @@
 
 from __future__ import annotations
 
-from unittest.mock import MagicMock, patch
+import sys
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -10,25 +11,79 @@ import pytest
 class TestEmbeddingsService:
     """Tests for the embeddings service."""
 
-    @patch("app.services.embeddings.SentenceTransformer")
-    def test_load_model(self, mock_transformer_class):
-        """Loading the model should create a SentenceTransformer instance."""
-        from app.services.embeddings import load_model
+    @pytest.fixture
+    def local_model_settings(self, monkeypatch):
+        """Configure a local (non-API) model load and reset the loader state afterwards."""
         import app.services.embeddings as emb_module
 
-        # Reset singleton
+        monkeypatch.delenv("HF_API_TOKEN", raising=False)
+        with patch("app.services.embeddings.settings") as mock_settings:
+            mock_settings.embedding_model_name = "test-model"
+            mock_settings.embedding_backend = "torch"
+            mock_settings.embedding_precision = "fp32"
+            yield mock_settings
         emb_module._model = None
+        emb_module._model_variant = None
+
+    @patch("sentence_transformers.SentenceTransformer")
+    def test_load_model(self, mock_transformer_class, local_model_settings):
+        """Loading the model should create a SentenceTransformer instance."""
+        import app.services.embeddings as emb_module
+        from app.services.embeddings import load_model
 
         mock_model = MagicMock()
+        mock_model.device.type = "cpu"
         mock_model.get_sentence_embedding_dimension.return_value = 384
         mock_transformer_class.return_value = mock_model
 
         result = load_model()
         assert result is mock_model
-        mock_transformer_class.assert_called_once()
+        mock_transformer_class.assert_called_once_with("test-model")
+        assert emb_module._model_variant == "fp32-cpu"
+
+    @patch("torch.quantization.quantize_dynamic")
+    @patch("sentence_transformers.SentenceTransformer")
+    def test_load_model_auto_precision_quantizes_on_cpu(
+        self, mock_transformer_class, mock_quantize, local_model_settings
+    ):
+        """With precision "auto" on CPU the torch model should be dynamically quantized to INT8."""
+        import app.services.embeddings as emb_module
+        from app.services.embeddings import load_model
 
-        # Cleanup
-        emb_module._model = None
+        local_model_settings.embedding_precision = "auto"
+        mock_model = MagicMock()
+        mock_model.device.type = "cpu"
+        mock_transformer_class.return_value = mock_model
+        quantized = MagicMock()
+        quantized.get_sentence_embedding_dimension.return_value = 384
+        mock_quantize.return_value = quantized
+
+        assert load_model() is quantized
+        assert mock_quantize.call_args[0][0] is mock_model
+        assert emb_module._model_variant == "int8-cpu"
+
+    @patch("sentence_transformers.SentenceTransformer")
+    def test_load_model_onnx_falls_back_to_fp32(self, mock_transformer_class, local_model_settings):
+        """If the INT8 ONNX graph can't be loaded, the FP32 ONNX export should be used instead."""
+        import app.services.embeddings as emb_module
+        from app.services.embeddings import ONNX_INT8_FILE, load_model
+
+        local_model_settings.embedding_backend = "onnx"
+        local_model_settings.embedding_precision = "auto"
+        fp32_model = MagicMock()
+        fp32_model.get_sentence_embedding_dimension.return_value = 384
+        mock_transformer_class.side_effect = [OSError("no INT8 graph"), fp32_model]
+        onnxruntime = MagicMock()
+        onnxruntime.get_available_providers.return_value = ["CPUExecutionProvider"]
+
+        with patch.dict(sys.modules, {"onnxruntime": onnxruntime}):
+            result = load_model()
+
+        assert result is fp32_model
+        int8_call, fp32_call = mock_transformer_class.call_args_list
+        assert int8_call.kwargs["model_kwargs"]["file_name"] == ONNX_INT8_FILE
+        assert "file_name" not in fp32_call.kwargs["model_kwargs"]
+        assert emb_module._model_variant == "onnx-fp32-cpu"
 
     @patch("app.services.embeddings._model")
     def test_encode_text(self, mock_model):
@@ -49,12 +104,136 @@ class TestEmbeddingsService:
         # Cleanup
         emb_module._model = None
 
+    def test_encode_text_caches_repeat_questions(self):
+        """Repeated texts should be served from the cache without re-encoding."""
+        import numpy as np
+
+        import app.services.embeddings as emb_module
+        from app.services.embeddings import encode_text
+
+        mock_model_instance = MagicMock()
+        mock_model_instance.encode.return_value = np.ones(384)
+        emb_module._model = mock_model_instance
+        emb_module._embedding_cache.clear()
+
+        first = encode_text("מה לאכול?")
+        second = encode_text("מה לאכול?")
+        assert first == second
+        mock_model_instance.encode.assert_called_once()
+
+        # Cleanup
+        emb_module._model = None
+        emb_module._embedding_cache.clear()
+
+    @patch("app.services.embeddings.store_cached_embeddings_batch")
+    @patch("app.services.embeddings.get_cached_embeddings_batch", return_value={})
+    def test_encode_batch_only_encodes_cache_misses(self, mock_lookup, mock_store):
+        """encode_batch should reuse cached embeddings and keep input order."""
+        import numpy as np
+
+        import app.services.embeddings as emb_module
+        from app.services.embeddings import encode_batch, encode_text
+
+        mock_model_instance = MagicMock()
+        mock_model_instance.encode.side_effect = [np.full(384, 1.0), np.full((1, 384), 2.0)]
+        emb_module._model = mock_model_instance
+        emb_module._embedding_cache.clear()
+
+        cached = encode_text("שיבויה")
+        result = encode_batch(["אסקוסה", " שיבויה "])
+        assert result.shape == (2, 384)
+        assert result.dtype == np.float32
+        assert result[0].tolist() == [2.0] * 384
+        assert result[1].tolist() == cached
+        assert mock_model_instance.encode.call_args[0][0] == ["אסקוסה"]
+
+        # Cleanup
+        emb_module._model = None
+        emb_module._embedding_cache.clear()
+
+    @patch("app.services.embeddings.store_cached_embeddings_batch")
+    @patch("app.services.embeddings.get_cached_embeddings_batch", return_value={})
+    def test_encode_batch_embeds_duplicate_texts_once(self, mock_lookup, mock_store):
+        """Repeated texts in one batch should be sent to the model once and fanned back out."""
+        import numpy as np
+
+        import app.services.embeddings as emb_module
+        from app.services.embeddings import encode_batch
+
+        mock_model_instance = MagicMock()
+        mock_model_instance.encode.return_value = np.stack([np.full(384, 1.0), np.full(384, 2.0)])
+        emb_module._model = mock_model_instance
+        emb_module._embedding_cache.clear()
+
+        result = encode_batch(["ראמן", "סושי", " ראמן "])
+        assert mock_model_instance.encode.call_args[0][0] == ["ראמן", "סושי"]
+        assert result[0].tolist() == result[2].tolist() == [1.0] * 384
+        assert result[1].tolist() == [2.0] * 384
+
+        # Cleanup
+        emb_module._model = None
+        emb_module._embedding_cache.clear()
+
+    @patch("app.services.embeddings.store_cached_embeddings_batch")
+    @patch("app.services.embeddings.get_cached_embeddings_batch")
+    def test_encode_batch_uses_persisted_cache(self, mock_lookup, mock_store):
+        """Persisted hits should skip the model; only the misses are encoded and stored."""
+        import numpy as np
+
+        import app.services.embeddings as emb_module
+        from app.services.embeddings import _cache_model_id, _text_hash, encode_batch
+
+        mock_model_instance = MagicMock()
+        mock_model_instance.encode.return_value = np.full((1, 384), 2.0)
+        emb_module._model = mock_model_instance
+        emb_module._embedding_cache.clear()
+        mock_lookup.return_value = {_text_hash("גינזה"): [3.0] * 384}
+
+        result = encode_batch(["גינזה", "אואנו"])
+        assert result[0].tolist() == [3.0] * 384
+        assert result[1].tolist() == [2.0] * 384
+        assert mock_model_instance.encode.call_args[0][0] == ["אואנו"]
+        assert sorted(mock_lookup.call_args[0][0]) == sorted([_text_hash("גינזה"), _text_hash("אואנו")])
+        stored = mock_store.call_args[0][0]
+        assert [row["hash"] for row in stored] == [_text_hash("אואנו")]
+        assert stored[0]["model"] == _cache_model_id()
+
+        # Cleanup
+        emb_module._model = None
+        emb_module._embedding_cache.clear()
+
+    def test_cache_model_id_uses_resolved_precision(self):
+        """Cache keys should differ per resolved precision/provider, not per configured "auto"."""
+        import app.services.embeddings as emb_module
+
+        emb_module._use_api = False
+        emb_module._model_variant = "int8-cpu"
+        cpu_id = emb_module._cache_model_id()
+        emb_module._model_variant = "fp16-cuda"
+        gpu_id = emb_module._cache_model_id()
+        assert cpu_id != gpu_id
+        assert cpu_id.endswith(":int8-cpu")
+
+        # Cleanup
+        emb_module._model_variant = None
+
 
 class TestGroqClient:
     """Tests for the Groq client wrapper (openai/gpt-oss-20b, non-streaming)."""
 
-    @patch("app.services.groq_client.Groq")
-    def test_generate_response(self, mock_groq_class):
+    @pytest.fixture(autouse=True)
+    def groq_settings(self):
+        """Patch the Groq settings once per test instead of inside every test body."""
+        with patch("app.services.groq_client.settings") as mock_settings:
+            mock_settings.groq_api_key = "test-key"
+            mock_settings.groq_model_name = "openai/gpt-oss-20b"
+            mock_settings.rag_temperature = 1.0
+            mock_settings.rag_max_completion_tokens = 8192
+            mock_settings.rag_top_p = 1.0
+            yield mock_settings
+
+    @patch("app.services.groq_client.AsyncGroq")
+    async def test_generate_response(self, mock_groq_class):
         """generate_response should call Groq API and return content text."""
         from app.services.groq_client import generate_response
         import app.services.groq_client as groq_module
@@ -68,20 +247,12 @@ class TestGroqClient:
 
         mock_response = MagicMock()
         mock_response.choices = [MagicMock(message=MagicMock(content="תשובה לדוגמה"))]
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
 
-        with patch("app.services.groq_client.settings") as mock_settings:
-            mock_settings.groq_api_key = "test-key"
-            mock_settings.groq_model_name = "openai/gpt-oss-20b"
-            mock_settings.rag_temperature = 1.0
-            mock_settings.rag_max_completion_tokens = 8192
-            mock_settings.rag_top_p = 1.0
-            mock_settings.rag_reasoning_effort = "medium"
-
-            result = generate_response(
-                context="מידע בדיקה",
-                question="שאלה?",
-            )
+        result = await generate_response(
+            context="מידע בדיקה",
+            question="שאלה?",
+        )
 
         assert result == "תשובה לדוגמה"
 
@@ -89,14 +260,14 @@ class TestGroqClient:
         call_kwargs = mock_client.chat.completions.create.call_args[1]
         assert call_kwargs["stream"] is False
         assert call_kwargs["model"] == "openai/gpt-oss-20b"
-        assert call_kwargs["reasoning_effort"] == "medium"
-        assert call_kwargs["max_completion_tokens"] == 8192
+        assert "reasoning_effort" not in call_kwargs
+        assert call_kwargs["max_tokens"] == 8192
 
         # Cleanup
         groq_module._client = None
 
-    @patch("app.services.groq_client.Groq")
-    def test_generate_response_handles_error(self, mock_groq_class):
+    @patch("app.services.groq_client.AsyncGroq")
+    async def test_generate_response_handles_error(self, mock_groq_class):
         """generate_response should handle API errors gracefully."""
         from app.services.groq_client import generate_response
         import app.services.groq_client as groq_module
@@ -105,21 +276,99 @@ class TestGroqClient:
 
         mock_client = MagicMock()
         mock_groq_class.return_value = mock_client
-        mock_client.chat.completions.create.side_effect = Exception("API error")
+        mock_client.chat.completions.create = AsyncMock(side_effect=Exception("API error"))
 
-        with patch("app.services.groq_client.settings") as mock_settings:
-            mock_settings.groq_api_key = "test-key"
-            mock_settings.groq_model_name = "openai/gpt-oss-20b"
-            mock_settings.rag_temperature = 1.0
-            mock_settings.rag_max_completion_tokens = 8192
-            mock_settings.rag_top_p = 1.0
-            mock_settings.rag_reasoning_effort = "medium"
-
-            result = generate_response(
-                context="מידע",
-                question="שאלה?",
-            )
+        result = await generate_response(
+            context="מידע",
+            question="שאלה?",
+        )
 
         assert "שגיאה" in result
 
         groq_module._client = None
+
+    @patch("app.services.groq_client.AsyncGroq")
+    async def test_generate_response_with_suggestions(self, mock_groq_class):
+        """generate_response_with_suggestions should return answer and follow-ups from one JSON-mode call."""
+        import app.services.groq_client as groq_module
+        from app.services.groq_client import generate_response_with_suggestions
+
+        groq_module._client = None
+
+        mock_client = MagicMock()
+        mock_groq_class.return_value = mock_client
+
+        content = '{"answer": "תשובה", "suggestions": ["שאלה 1", "שאלה 2", "שאלה 3", "שאלה 4"]}'
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock(message=MagicMock(content=content))]
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+
+        answer, suggestions = await generate_response_with_suggestions(
+            context="מידע",
+            question="שאלה?",
+        )
+
+        assert answer == "תשובה"
+        assert suggestions == ["שאלה 1", "שאלה 2", "שאלה 3"]
+        mock_client.chat.completions.create.assert_awaited_once()
+        call_kwargs = mock_client.chat.completions.create.call_args[1]
+        assert call_kwargs["response_format"] == {"type": "json_object"}
+
+        groq_module._client = None
+
+    @patch("app.services.groq_client.AsyncGroq")
+    async def test_generate_suggested_questions_caches_repeat_turns(self, mock_groq_class):
+        """Repeated (question, answer) pairs and failed answers should not call Groq again."""
+        import app.services.groq_client as groq_module
+        from app.services.groq_client import ERROR_ANSWER_TEXT, generate_suggested_questions
+
+        groq_module._client = None
+        groq_module._suggestions_cache.clear()
+
+        mock_client = MagicMock()
+        mock_groq_class.return_value = mock_client
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock(message=MagicMock(content="שאלה 1\nשאלה 2\nשאלה 3"))]
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+
+        first = await generate_suggested_questions("מה לאכול?", "ראמן")
+        second = await generate_suggested_questions("  מה   לאכול? ", "ראמן")
+        fallback = await generate_suggested_questions("מה לאכול?", ERROR_ANSWER_TEXT)
+
+        assert first == second == ["שאלה 1", "שאלה 2", "שאלה 3"]
+        assert len(fallback) == 3
+        mock_client.chat.completions.create.assert_awaited_once()
+
+        groq_module._client = None
+        groq_module._suggestions_cache.clear()
+
+
+class TestContextBudget:
+    """Tests for the RAG context trimming helpers."""
+
+    def test_trim_at_sentence_prefers_boundary(self):
+        """Long text should be cut at the last sentence end within the limit."""
+        from app.services.rag import _trim_at_sentence
+
+        text = "משפט ראשון ארוך. משפט שני ארוך מאוד שלא נכנס"
+        assert _trim_at_sentence(text, 30) == "משפט ראשון ארוך."
+        assert _trim_at_sentence("קצר", 30) == "קצר"
+
+    def test_estimate_tokens_grows_with_length(self):
+        """Token estimate should scale with text length."""
+        from app.services.rag import _estimate_tokens
+
+        assert _estimate_tokens("a" * 300) > _estimate_tokens("a" * 30)
+
+    def test_trim_history_keeps_recent_messages_within_budget(self):
+        """_trim_history should drop the oldest messages once the token budget is spent."""
+        from app.services.groq_client import _trim_history
+
+        history = [
+            {"role": "user", "content": "א" * 300},
+            {"role": "assistant", "content": "ב" * 30},
+            {"role": "user", "content": "ג" * 30},
+        ]
+        assert _trim_history(history, max_tokens=100) == history[1:]
+        assert _trim_history(history, max_tokens=1000) == history
+        assert _trim_history(history, max_tokens=5) == []
@@ -4,19 +4,10 @@ from __future__ import annotations
 
 from unittest.mock import patch
 
-import pytest
+import httpx
 from fastapi.testclient import TestClient
 
 
-@pytest.fixture
-def client():
-    """Create a test client with mocked dependencies."""
-    with patch("app.services.embeddings.load_model"):
-        from app.main import app
-
-        return TestClient(app)
-
-
 class TestSectionsEndpoint:
     """Tests for GET /api/sections."""
 
@@ -44,6 +35,24 @@ class TestSectionsEndpoint:
         data = response.json()
         assert data["categories"] == []
 
+    @patch("app.routers.sections._render_sections")
+    @patch("app.routers.sections.get_all_categories")
+    def test_get_sections_reuses_serialized_body(self, mock_get_categories, mock_render, client: TestClient):
+        """Unchanged category counts should reuse the cached response body."""
+        from app.routers import sections as sections_module
+
+        sections_module._sections_cache.clear()
+        mock_get_categories.return_value = [{"category": "hotels", "count": 3}]
+        mock_render.return_value = b'{"categories":[]}'
+
+        first = client.get("/api/sections")
+        assert first.status_code == 200
+        second = client.get("/api/sections", headers={"If-None-Match": first.headers["etag"]})
+        assert second.status_code == 304
+        mock_render.assert_called_once_with((("hotels", 3),))
+
+        sections_module._sections_cache.clear()
+
 
 class TestSectionContentEndpoint:
     """Tests for GET /api/section/{category}."""
@@ -115,11 +124,21 @@ class TestSearchEndpoint:
 class TestSuggestionsEndpoint:
     """Tests for GET /api/suggestions."""
 
-    def test_get_suggestions(self, client: TestClient):
+    async def test_get_suggestions(self, aclient: httpx.AsyncClient):
         """Suggestions endpoint should return a list of questions."""
-        response = client.get("/api/suggestions")
+        response = await aclient.get("/api/suggestions")
         assert response.status_code == 200
         data = response.json()
         assert "suggestions" in data
         assert len(data["suggestions"]) > 0
         assert all(isinstance(s, str) for s in data["suggestions"])
+
+    def test_get_suggestions_revalidates_with_etag(self, client: TestClient):
+        """A matching If-None-Match should get an empty 304."""
+        response = client.get("/api/suggestions")
+        etag = response.headers["etag"]
+        assert "max-age" in response.headers["cache-control"]
+
+        revalidated = client.get("/api/suggestions", headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
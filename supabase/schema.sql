@@ -17,17 +17,43 @@ create table if not exists tokyo_content (
   price_range text,
   recommended_duration text,
   best_time_to_visit text,
-  embedding vector(384),
+  -- halfvec (FP16): half the bytes per row in the table and the HNSW index; cosine ranking
+  -- of normalized 384-dim embeddings is unaffected at this precision
+  embedding halfvec(384),
   created_at timestamp default now()
 );
 
+-- Convert tables created with the earlier float32 vector(384) column (its index is rebuilt below)
+do $$
+begin
+  if exists (
+    select 1 from information_schema.columns
+    where table_name = 'tokyo_content' and column_name = 'embedding' and udt_name = 'vector'
+  ) then
+    drop index if exists idx_tokyo_content_embedding;
+    alter table tokyo_content alter column embedding type halfvec(384) using embedding::halfvec(384);
+  end if;
+end $$;
+
+-- Hash of each row's content, set by the seeding script: re-seeding skips rows that are already
+-- stored and prunes the ones that no longer exist
+alter table tokyo_content add column if not exists content_hash text;
+create unique index if not exists idx_tokyo_content_content_hash on tokyo_content(content_hash);
+
 -- Index on category for fast filtering
 create index if not exists idx_tokyo_content_category on tokyo_content(category);
 
--- Index on embedding for vector similarity search (ivfflat)
--- Note: run this AFTER inserting data (ivfflat needs data to build lists)
--- create index if not exists idx_tokyo_content_embedding on tokyo_content
---   using ivfflat (embedding vector_cosine_ops) with (lists = 10);
+-- Full-text search column over titles + Hebrew content ('simple' config: no stemming, works for Hebrew)
+alter table tokyo_content add column if not exists search_tsv tsvector
+  generated always as (
+    to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(title_hebrew, '') || ' ' || coalesce(content_hebrew, ''))
+  ) stored;
+
+create index if not exists idx_tokyo_content_search_tsv on tokyo_content using gin (search_tsv);
+
+-- Index on embedding for vector similarity search (hnsw: no training step, can be built on an empty table)
+create index if not exists idx_tokyo_content_embedding on tokyo_content
+  using hnsw (embedding halfvec_cosine_ops);
 
 -- User sessions table for chat history
 create table if not exists chat_sessions (
@@ -42,11 +68,16 @@ create table if not exists chat_sessions (
 -- Index on user_id + platform for quick session lookup
 create index if not exists idx_chat_sessions_user on chat_sessions(user_id, platform);
 
--- Vector similarity search function
+-- Vector similarity search function (top-K computed server-side, optional category filter).
+-- The return type and the embedding type changed, so drop the old signatures first.
+drop function if exists match_documents(vector, float, int);
+drop function if exists match_documents(vector, float, int, text);
+
 create or replace function match_documents (
-  query_embedding vector(384),
+  query_embedding halfvec(384),
   match_threshold float,
-  match_count int
+  match_count int,
+  category_filter text default null
 )
 returns table (
   id uuid,
@@ -55,6 +86,7 @@ returns table (
   content_hebrew text,
   category text,
   subcategory text,
+  tags text[],
   location_name text,
   similarity float
 )
@@ -67,10 +99,85 @@ as $$
     tokyo_content.content_hebrew,
     tokyo_content.category,
     tokyo_content.subcategory,
+    tokyo_content.tags,
     tokyo_content.location_name,
     1 - (tokyo_content.embedding <=> query_embedding) as similarity
   from tokyo_content
-  where 1 - (tokyo_content.embedding <=> query_embedding) > match_threshold
+  where (category_filter is null or tokyo_content.category = category_filter)
+    -- distance form of "similarity > match_threshold", so the filter reuses the ordering operator
+    and tokyo_content.embedding <=> query_embedding < 1 - match_threshold
   order by tokyo_content.embedding <=> query_embedding
   limit match_count;
 $$;
+
+-- Per-category item counts, aggregated in Postgres (used by GET /api/sections)
+create or replace function category_counts()
+returns table (
+  category text,
+  count bigint
+)
+language sql stable
+as $$
+  select tokyo_content.category, count(*) as count
+  from tokyo_content
+  group by tokyo_content.category
+  order by tokyo_content.category;
+$$;
+
+-- Empty tokyo_content before a re-seed (used by scripts/seed_database.py). TRUNCATE drops the
+-- table's files instead of deleting row by row, so no dead tuples or per-row WAL are left behind.
+-- Only the service role may call it.
+create or replace function truncate_tokyo_content()
+returns void
+language sql
+security definer
+set search_path = public
+as $$
+  truncate table tokyo_content;
+$$;
+
+revoke execute on function truncate_tokyo_content() from public, anon, authenticated;
+grant execute on function truncate_tokyo_content() to service_role;
+
+-- Keyword search over the GIN-indexed tsvector, ranked by ts_rank (used by POST /api/search)
+create or replace function keyword_search (
+  q text,
+  cat text default null,
+  lim int default 20
+)
+returns table (
+  id uuid,
+  title text,
+  title_hebrew text,
+  content_hebrew text,
+  category text,
+  subcategory text,
+  tags text[],
+  location_name text
+)
+language sql stable
+as $$
+  select
+    tokyo_content.id,
+    tokyo_content.title,
+    tokyo_content.title_hebrew,
+    tokyo_content.content_hebrew,
+    tokyo_content.category,
+    tokyo_content.subcategory,
+    tokyo_content.tags,
+    tokyo_content.location_name
+  from tokyo_content, websearch_to_tsquery('simple', q) as query
+  where tokyo_content.search_tsv @@ query
+    and (cat is null or tokyo_content.category = cat)
+  order by ts_rank(tokyo_content.search_tsv, query) desc
+  limit lim;
+$$;
+
+-- Persistent embedding cache shared by all workers and seed runs, keyed by sha256(text) + model
+create table if not exists embedding_cache (
+  hash text not null,
+  model text not null,
+  embedding vector(384) not null,
+  created_at timestamp default now(),
+  primary key (hash, model)
+);